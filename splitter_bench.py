@@ -0,0 +1,406 @@
+"""Reproducible benchmarks for the splitting engine.
+
+Generates deterministic synthetic sources, splits them across a matrix of
+formats, sizes, grids and output sizes, and writes the timings as JSON.
+Each case runs in a fresh subprocess so its peak RSS is its own.
+
+    python splitter_bench.py run --preset quick --output bench.json
+    python splitter_bench.py compare baseline.json bench.json
+    python splitter_bench.py resample --sizes 256 1024 4096
+"""
+import os
+import sys
+import json
+import math
+import time
+import random
+import shutil
+import argparse
+import platform
+import datetime
+import statistics
+import subprocess
+from pathlib import Path
+
+from PIL import Image, ImageChops, ImageStat
+
+from splitter_engine import (
+    DEFAULT_ENCODER,
+    ENCODER_PRESETS,
+    RESAMPLE_TIERS,
+    plan_decode,
+    resample,
+    split_and_resize_image,
+    target_dimensions,
+)
+from splitter_profile import StageProfiler, set_profiler
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+BENCH_VERSION = 2
+
+FORMATS = {"jpeg": ("JPEG", ".jpg"), "png": ("PNG", ".png"), "webp": ("WEBP", ".webp"), "bmp": ("BMP", ".bmp")}
+
+PRESETS = {
+    "quick": {
+        "formats": ["jpeg", "png"],
+        "modes": ["RGB"],
+        "megapixels": [1, 4],
+        "grids": ["1x1", "4x4"],
+        "sizes": [512, 1024],
+        "encoders": [DEFAULT_ENCODER],
+    },
+    "standard": {
+        "formats": ["jpeg", "png", "webp", "bmp"],
+        "modes": ["RGB", "RGBA"],
+        "megapixels": [1, 16],
+        "grids": ["1x1", "2x2", "4x4", "10x10"],
+        "sizes": [512, 1024, 2048],
+        "encoders": list(ENCODER_PRESETS),
+    },
+    "full": {
+        "formats": ["jpeg", "png", "webp", "bmp"],
+        "modes": ["RGB", "RGBA"],
+        "megapixels": [1, 4, 16, 50, 100],
+        "grids": ["1x1", "2x2", "4x4", "10x10"],
+        "sizes": [512, 1024, 2048, 4096],
+        "encoders": list(ENCODER_PRESETS),
+    },
+}
+
+# Relative slowdown (and absolute floor) before compare flags a regression.
+DEFAULT_THRESHOLD = 0.10
+MIN_TIME_DELTA = 0.005
+MIN_RSS_DELTA_MB = 5
+MIN_BYTES_DELTA = 1024
+
+
+def parse_grid(text):
+    """Parse "AxH" into (across, high)."""
+    across, _, high = text.lower().partition("x")
+    return int(across), int(high)
+
+
+def source_dimensions(megapixels):
+    """Return a 4:3 (width, height) with roughly the requested pixel count."""
+    height = int((megapixels * 1_000_000 * 3 / 4) ** 0.5)
+    return height * 4 // 3, height
+
+
+def _random_bytes(rng, count):
+    return rng.getrandbits(count * 8).to_bytes(count, "little")
+
+
+def generate_source(directory, format_key, mode, megapixels):
+    """Create (or reuse) a deterministic synthetic source image."""
+    img_format, extension = FORMATS[format_key]
+    path = Path(directory) / f"source_{megapixels}mp_{mode.lower()}{extension}"
+    if path.exists():
+        return path
+
+    width, height = source_dimensions(megapixels)
+    rng = random.Random(f"{megapixels}-{mode}")
+    # Smooth colour regions plus a repeating fine texture, so the encoders see
+    # something closer to a photo than to flat colour or pure noise.
+    base = Image.frombytes("RGB", (16, 12), _random_bytes(rng, 16 * 12 * 3)).resize((width, height), Image.Resampling.BICUBIC)
+    texture = Image.frombytes("RGB", (256, 256), _random_bytes(rng, 256 * 256 * 3))
+    detail = Image.new("RGB", (width, height))
+    for top in range(0, height, 256):
+        for left in range(0, width, 256):
+            detail.paste(texture, (left, top))
+    img = Image.blend(base, detail, 0.15)
+    if mode == "RGBA":
+        img.putalpha(Image.linear_gradient("L").resize((width, height)))
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    img.save(path, img_format)
+    return path
+
+
+def build_cases(formats, modes, megapixels, grids, sizes, encoders=(DEFAULT_ENCODER,)):
+    """Expand the matrix into case dictionaries, skipping impossible ones."""
+    cases = []
+    for format_key in formats:
+        for mode in modes:
+            if mode == "RGBA" and format_key == "jpeg":
+                continue
+            for mp in megapixels:
+                for grid in grids:
+                    for size in sizes:
+                        for encoder in encoders:
+                            across, high = parse_grid(grid)
+                            cases.append({
+                                "id": f"{format_key}-{mode.lower()}-{mp}mp-{across}x{high}-{size}-{encoder}",
+                                "format": format_key,
+                                "mode": mode,
+                                "megapixels": mp,
+                                "across": across,
+                                "high": high,
+                                "output_size": size,
+                                "encoder": encoder,
+                            })
+    return cases
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB, or None if unknown."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes.
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def run_case(case, source, repeat):
+    """Time one case in this process and return its measurements."""
+    out_folder = "bench_out"
+    encoder = case.get("encoder", DEFAULT_ENCODER)
+    timings = []
+    encode_times = []
+    for _ in range(repeat):
+        # The profiler's save stage gives the encode time and bytes written.
+        profiler = StageProfiler()
+        set_profiler(profiler)
+        start = time.perf_counter()
+        try:
+            split_and_resize_image(str(source), case["across"], case["high"], case["output_size"],
+                                   out_folder, True, "bench", encoder=encoder)
+        finally:
+            set_profiler(None)
+        timings.append(time.perf_counter() - start)
+        encode_times.append(sum(profiler.durations.get("save", ())))
+        encoded_bytes = profiler.bytes.get("save", 0)
+        shutil.rmtree(Path(source).parent / out_folder, ignore_errors=True)
+
+    with Image.open(source) as img:
+        width, height = img.size
+    tiles = case["across"] * case["high"]
+    wall = statistics.median(timings)
+    return dict(case, **{
+        "width": width,
+        "height": height,
+        "tiles": tiles,
+        "repeat": repeat,
+        "wall_s": round(wall, 4),
+        "wall_s_all": [round(t, 4) for t in timings],
+        "per_tile_ms": round(wall / tiles * 1000, 3),
+        "encode_ms_per_tile": round(statistics.median(encode_times) / tiles * 1000, 3),
+        "bytes_per_tile": round(encoded_bytes / tiles),
+        "mp_per_s": round(width * height / 1_000_000 / wall, 2),
+        "tiles_per_s": round(tiles / wall, 2),
+        "peak_rss_mb": peak_rss_mb(),
+    })
+
+
+def machine_info():
+    return {
+        "python": platform.python_version(),
+        "pillow": Image.__version__,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def command_run(args):
+    preset = PRESETS[args.preset]
+    cases = build_cases(args.formats or preset["formats"], args.modes or preset["modes"],
+                        args.megapixels or preset["megapixels"], args.grids or preset["grids"],
+                        args.sizes or preset["sizes"], args.encoders or preset["encoders"])
+    workdir = Path(args.workdir)
+    results = []
+    print(f"Running {len(cases)} case(s), {args.repeat} repeat(s) each...", file=sys.stderr)
+    for idx, case in enumerate(cases, 1):
+        source = generate_source(workdir / case["format"], case["format"], case["mode"], case["megapixels"])
+        # A fresh interpreter per case keeps peak RSS attributable to it.
+        completed = subprocess.run(
+            [sys.executable, __file__, "case", json.dumps(case), str(source), str(args.repeat)],
+            capture_output=True, text=True
+        )
+        if completed.returncode != 0:
+            message = completed.stderr.strip().splitlines()[-1] if completed.stderr.strip() else "failed"
+            print(f"  [{idx}/{len(cases)}] {case['id']} ✗ {message}", file=sys.stderr)
+            results.append(dict(case, error=message))
+            continue
+        measurement = json.loads(completed.stdout)
+        print(f"  [{idx}/{len(cases)}] {case['id']}: {measurement['wall_s']:.3f}s "
+              f"{measurement['mp_per_s']} MP/s {measurement['tiles_per_s']} tiles/s "
+              f"{measurement['peak_rss_mb']} MB, encode {measurement['encode_ms_per_tile']} ms "
+              f"{measurement['bytes_per_tile'] / 1024:.1f} KB per tile", file=sys.stderr)
+        results.append(measurement)
+
+    report = {
+        "version": BENCH_VERSION,
+        "created": datetime.datetime.now().isoformat(timespec="seconds"),
+        "preset": args.preset,
+        "machine": machine_info(),
+        "cases": results,
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        Path(args.output).write_text(text + "\n", encoding="utf-8")
+        print(f"Wrote {args.output}", file=sys.stderr)
+    else:
+        print(text)
+
+    if args.compare:
+        return print_comparison(load_report(args.compare), report, args.threshold)
+    return 1 if any("error" in case for case in results) else 0
+
+
+def psnr(image, reference):
+    """Peak signal-to-noise ratio of image against reference, in dB."""
+    diff = ImageChops.difference(image.convert("RGB"), reference.convert("RGB"))
+    pixels = image.width * image.height
+    mse = sum(ImageStat.Stat(diff).sum2) / (3 * pixels)
+    if mse == 0:
+        return float("inf")
+    return 10 * math.log10(255 ** 2 / mse)
+
+
+def format_psnr(value):
+    return "identical" if math.isinf(value) else f"{value:.1f}"
+
+
+def time_resample(source, size, tier, repeat):
+    """Decode source and resample it to size with tier; return (median seconds, result)."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        with Image.open(source) as img:
+            width, height = target_dimensions(img.width, img.height, size)
+            decoded = plan_decode(img, width, height, RESAMPLE_TIERS[tier]["oversample"])
+            result = resample(decoded, (width, height), tier)
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings), result
+
+
+def command_resample(args):
+    """Print a quality-vs-speed table of the resampling tiers as Markdown.
+
+    Quality is the PSNR against a single LANCZOS pass over the fully decoded
+    source, so "best" scores high but not infinite where reduced decoding
+    (JPEG DCT scaling or reduce()) already applies.
+    """
+    workdir = Path(args.workdir)
+    print("| Source | Output | Scale | Tier | ms | vs best | PSNR dB |")
+    print("|---|---|---|---|---:|---:|---:|")
+    for format_key in args.formats:
+        source = generate_source(workdir / format_key, format_key, "RGB", args.megapixels)
+        with Image.open(source) as img:
+            img.load()
+            source_size = img.size
+            references = {size: img.resize(target_dimensions(img.width, img.height, size),
+                                           Image.Resampling.LANCZOS)
+                          for size in args.sizes}
+        for size in args.sizes:
+            reference = references[size]
+            scale = max(source_size) / max(reference.size)
+            results = {tier: time_resample(source, size, tier, args.repeat) for tier in RESAMPLE_TIERS}
+            best_seconds = results["best"][0]
+            for tier, (seconds, image) in results.items():
+                print(f"| {format_key} {args.megapixels} MP | {reference.width}x{reference.height} "
+                      f"| {scale:.1f}x | {tier} | {seconds * 1000:.0f} | {seconds / best_seconds:.2f}x "
+                      f"| {format_psnr(psnr(image, reference))} |")
+            sys.stdout.flush()
+    return 0
+
+
+def command_case(args):
+    case = json.loads(args.case)
+    print(json.dumps(run_case(case, args.source, args.repeat)))
+    return 0
+
+
+def load_report(path):
+    with open(path, "r", encoding="utf-8") as handle:
+        return json.load(handle)
+
+
+def compare_reports(baseline, current, threshold=DEFAULT_THRESHOLD):
+    """Return (case_id, metric, old, new, change) rows for every regression."""
+    baseline_cases = {case["id"]: case for case in baseline.get("cases", []) if "error" not in case}
+    regressions = []
+    for case in current.get("cases", []):
+        old = baseline_cases.get(case["id"])
+        if old is None or "error" in case:
+            continue
+        checks = [("wall_s", MIN_TIME_DELTA), ("peak_rss_mb", MIN_RSS_DELTA_MB),
+                  ("bytes_per_tile", MIN_BYTES_DELTA)]
+        for metric, floor in checks:
+            old_value, new_value = old.get(metric), case.get(metric)
+            if not old_value or new_value is None:
+                continue
+            if new_value > old_value * (1 + threshold) and new_value - old_value > floor:
+                regressions.append((case["id"], metric, old_value, new_value, new_value / old_value - 1))
+    return regressions
+
+
+def print_comparison(baseline, current, threshold):
+    regressions = compare_reports(baseline, current, threshold)
+    if not regressions:
+        print(f"No regressions beyond {threshold:.0%}.", file=sys.stderr)
+        return 0
+    print(f"{len(regressions)} regression(s) beyond {threshold:.0%}:", file=sys.stderr)
+    for case_id, metric, old, new, change in regressions:
+        print(f"  ✗ {case_id} {metric}: {old} -> {new} (+{change:.0%})", file=sys.stderr)
+    return 1
+
+
+def command_compare(args):
+    return print_comparison(load_report(args.baseline), load_report(args.current), args.threshold)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the image splitting engine")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = subparsers.add_parser("run", help="Run the benchmark matrix")
+    run_parser.add_argument('--preset', choices=sorted(PRESETS), default="quick",
+                            help="Matrix to run; the options below override parts of it (default: quick)")
+    run_parser.add_argument('--formats', nargs='+', choices=sorted(FORMATS))
+    run_parser.add_argument('--modes', nargs='+', choices=["RGB", "RGBA"])
+    run_parser.add_argument('--megapixels', nargs='+', type=int)
+    run_parser.add_argument('--grids', nargs='+', help="Grid sizes such as 1x1 4x4 10x10")
+    run_parser.add_argument('--sizes', nargs='+', type=int, help="Output sizes such as 512 4096")
+    run_parser.add_argument('--encoders', nargs='+', choices=list(ENCODER_PRESETS),
+                            help="Encoder presets to compare (default: balanced for quick, all otherwise)")
+    run_parser.add_argument('--repeat', type=int, default=3, help="Runs per case; the median is reported (default: 3)")
+    run_parser.add_argument('--workdir', default=".bench", help="Where synthetic sources are cached (default: .bench)")
+    run_parser.add_argument('--output', help="Write the JSON report here instead of stdout")
+    run_parser.add_argument('--compare', metavar="BASELINE", help="Compare against a saved report afterwards")
+    run_parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                            help="Relative slowdown flagged as a regression (default: 0.10)")
+    run_parser.set_defaults(handler=command_run)
+
+    compare_parser = subparsers.add_parser("compare", help="Flag regressions between two reports")
+    compare_parser.add_argument('baseline')
+    compare_parser.add_argument('current')
+    compare_parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD)
+    compare_parser.set_defaults(handler=command_compare)
+
+    resample_parser = subparsers.add_parser("resample",
+                                            help="Print a quality-vs-speed table of the resampling tiers")
+    resample_parser.add_argument('--formats', nargs='+', choices=sorted(FORMATS), default=["jpeg", "png"])
+    resample_parser.add_argument('--megapixels', type=int, default=16, help="Source size (default: 16)")
+    resample_parser.add_argument('--sizes', nargs='+', type=int, default=[256, 1024, 2048, 6000],
+                                 help="Output sizes, longest side (default: 256 1024 2048 6000)")
+    resample_parser.add_argument('--repeat', type=int, default=3, help="Runs per tier; the median is reported (default: 3)")
+    resample_parser.add_argument('--workdir', default=".bench", help="Where synthetic sources are cached (default: .bench)")
+    resample_parser.set_defaults(handler=command_resample)
+
+    case_parser = subparsers.add_parser("case", help=argparse.SUPPRESS)
+    case_parser.add_argument('case')
+    case_parser.add_argument('source')
+    case_parser.add_argument('repeat', type=int)
+    case_parser.set_defaults(handler=command_case)
+
+    args = parser.parse_args()
+    sys.exit(args.handler(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,1565 @@
+"""Image splitting engine shared by the command line and the GUI.
+
+Only Pillow is required here, so headless runs never import the GUI stack.
+"""
+import io
+import os
+import re
+import sys
+import glob
+import json
+import math
+import mmap
+import queue
+import shutil
+import hashlib
+import tempfile
+import threading
+from collections import deque
+from contextlib import contextmanager
+from pathlib import Path
+
+from PIL import Image
+
+from splitter_profile import (
+    StageProfiler,
+    add_allocation,
+    add_bytes,
+    get_profiler,
+    set_profiler,
+    stage,
+    wrap_thread,
+)
+
+
+VALID_EXTENSIONS = {".jpg", ".jpeg", ".png", ".bmp", ".webp"}
+
+# Tiles written by split_and_resize_image(); skipped when walking folders so
+# a re-run over a processed tree doesn't split its own output again.
+TILE_NAME_PATTERN = re.compile(r"_part_\d+$")
+
+TILING_MODES = ("auto", "per_tile", "resize_once")
+
+# Reduced-resolution decoding keeps at least this many source pixels per
+# output pixel on each axis before the final resample.
+DECODE_OVERSAMPLE = 2
+
+# Resampling tiers. Each sets how closely decoding may approach the output
+# size (oversample), the filter for shrinking and for enlarging, and
+# Pillow's reducing_gap: when shrinking by at least that factor, an integer
+# reduce() does the bulk of the work before the final filter. "best" is a
+# single LANCZOS pass, as before tiers existed.
+RESAMPLE_TIERS = {
+    "fast": {
+        "oversample": 1,
+        "downscale": Image.Resampling.BICUBIC,
+        "upscale": Image.Resampling.BILINEAR,
+        "reducing_gap": 1.0,
+    },
+    "balanced": {
+        "oversample": DECODE_OVERSAMPLE,
+        "downscale": Image.Resampling.LANCZOS,
+        "upscale": Image.Resampling.BICUBIC,
+        "reducing_gap": 2.0,
+    },
+    "best": {
+        "oversample": DECODE_OVERSAMPLE,
+        "downscale": Image.Resampling.LANCZOS,
+        "upscale": Image.Resampling.LANCZOS,
+        "reducing_gap": None,
+    },
+}
+DEFAULT_RESAMPLE = "balanced"
+
+# Single-worker batches run as a reader -> transform -> writer pipeline.
+# The reader holds at most PIPELINE_READ_AHEAD source files in memory, and
+# at most PIPELINE_TILE_QUEUE resized tiles wait to be encoded and written.
+PIPELINE_READ_AHEAD = 2
+PIPELINE_TILE_QUEUE = 16
+
+# Incremental runs keep one manifest per source directory. It is flushed
+# every MANIFEST_SAVE_INTERVAL finished images so an interrupted run keeps
+# most of its progress.
+MANIFEST_NAME = ".splitter_manifest.json"
+MANIFEST_VERSION = 1
+MANIFEST_SAVE_INTERVAL = 100
+
+# Deduplication fingerprints sources that share a size by hashing this many
+# bytes from each end, and confirms matches with a hash of the whole file.
+DEDUP_PARTIAL_BYTES = 64 * 1024
+DEDUP_MODES = ("link", "copy")
+
+# Low-memory mode: a source that would need more than the memory ceiling
+# decoded in full is split one band of grid rows at a time. A band may use
+# up to this share of the ceiling; the rest is headroom for the resampled
+# tiles and the encoder. --low-memory without a ceiling uses the default.
+LOW_MEMORY_BAND_SHARE = 0.5
+DEFAULT_MAX_MEMORY_MB = 1024
+
+# Encoder presets trade encode time against file size at the same quality.
+# "balanced" spells out Pillow's defaults, so it reproduces earlier output.
+# An explicit quality overrides the preset's for JPEG and WebP.
+ENCODER_PRESETS = {
+    "fast": {
+        "JPEG": {"quality": 75},
+        "PNG": {"compress_level": 1},
+        "WEBP": {"quality": 80, "method": 0},
+    },
+    "balanced": {
+        "JPEG": {"quality": 75},
+        "PNG": {"compress_level": 6},
+        "WEBP": {"quality": 80, "method": 4},
+    },
+    "smallest": {
+        "JPEG": {"quality": 75, "optimize": True, "progressive": True},
+        "PNG": {"compress_level": 9, "optimize": True},
+        "WEBP": {"quality": 80, "method": 6},
+    },
+}
+DEFAULT_ENCODER = "balanced"
+
+# Tile modes the JPEG encoder accepts; other tiles (RGBA, P, LA, ...) are
+# converted to RGB before they are written as JPEG.
+JPEG_MODES = {"1", "L", "RGB", "RGBX", "CMYK", "YCbCr"}
+
+
+def is_image_path(path):
+    """Return True if path has one of the supported image extensions."""
+    return Path(path).suffix.lower() in VALID_EXTENSIONS
+
+
+def _walk_images(directory):
+    """Yield the images below directory, one folder listing at a time."""
+    try:
+        entries = sorted(os.scandir(directory), key=lambda entry: entry.name)
+    except OSError as exc:
+        print(f"Warning: Cannot read folder {directory}: {exc}")
+        return
+    subdirectories = []
+    for entry in entries:
+        if entry.is_dir(follow_symlinks=False):
+            subdirectories.append(entry.path)
+        elif is_image_path(entry.name) and not TILE_NAME_PATTERN.search(Path(entry.name).stem):
+            yield Path(entry.path)
+    for subdirectory in subdirectories:
+        yield from _walk_images(subdirectory)
+
+
+def _read_path_list(stream, null_separated=False):
+    """Yield paths from a newline- or NUL-delimited stream as they arrive."""
+    if not null_separated:
+        for line in stream:
+            line = line.rstrip("\r\n")
+            if line:
+                yield line
+        return
+
+    buffer = ""
+    while True:
+        chunk = stream.read(64 * 1024)
+        if not chunk:
+            break
+        buffer += chunk
+        *names, buffer = buffer.split("\0")
+        for name in names:
+            if name:
+                yield name
+    if buffer.strip("\r\n"):
+        yield buffer.strip("\r\n")
+
+
+def _expand_source(source):
+    path = Path(source)
+    if path.is_dir():
+        yield from _walk_images(path)
+    elif not path.exists() and any(char in source for char in "*?["):
+        for match in glob.iglob(source, recursive=True):
+            if is_image_path(match) and os.path.isfile(match):
+                yield Path(match)
+    else:
+        yield path
+
+
+def iter_image_paths(sources, stdin=None, null_separated=False):
+    """Lazily expand command-line sources into image paths.
+
+    Each source may be a file (passed through as-is), a folder (searched
+    recursively for supported images), a glob pattern, or ``-`` to read more
+    sources from ``stdin`` (one per line, or NUL-separated). Nothing is
+    listed up front, so processing can start while enumeration continues.
+    """
+    for source in sources:
+        if source == "-":
+            for entry in _read_path_list(stdin or sys.stdin, null_separated):
+                yield from _expand_source(entry)
+        else:
+            yield from _expand_source(source)
+
+
+def target_dimensions(width, height, target_size):
+    """Return the (width, height) that fits the longest edge to target_size."""
+    if width > height:
+        return target_size, int(target_size * height / width)
+    return int(target_size * width / height), target_size
+
+
+def resample(image, size, tier=DEFAULT_RESAMPLE, box=None):
+    """Resize image (or the region ``box`` of it) to size with a resampling tier.
+
+    The tier's shrinking filter is used when either axis gets smaller, with
+    reduce() first for large factors; otherwise its enlarging filter.
+    """
+    options = RESAMPLE_TIERS[tier]
+    left, top, right, bottom = box if box is not None else (0, 0) + image.size
+    if size[0] < right - left or size[1] < bottom - top:
+        try:
+            return image.resize(size, options["downscale"], box=box, reducing_gap=options["reducing_gap"])
+        except ValueError:
+            # Modes reduce() does not support; filter in one pass instead.
+            return image.resize(size, options["downscale"], box=box)
+    return image.resize(size, options["upscale"], box=box)
+
+
+def resize_image_keep_aspect_ratio(image, target_size, tier=DEFAULT_RESAMPLE):
+    """Resize image maintaining aspect ratio."""
+    new_width, new_height = target_dimensions(image.width, image.height, target_size)
+    return resample(image, (new_width, new_height), tier)
+
+
+def choose_tiling(small_width, small_height, output_size, tile_count, tiling="auto"):
+    """Pick the tiling path for a grid of small_width×small_height cells.
+
+    ``per_tile`` crops every cell at full resolution and resamples it on its
+    own. ``resize_once`` resamples the whole grid region once to the combined
+    output resolution and slices the tiles out of that. Both sample the source
+    at identical positions; they differ only in a seam band of up to three
+    pixels along interior tile edges, where resize_once blends in the
+    neighbouring cell instead of clamping at the edge. ``auto`` picks
+    resize_once when tiles are being downscaled and the grid has more than
+    one cell, which keeps that seam band within a few pixels.
+    """
+    if tiling not in TILING_MODES:
+        raise ValueError(f"Unknown tiling mode: {tiling}")
+    if tiling != "auto":
+        return tiling
+    tile_width, tile_height = target_dimensions(small_width, small_height, output_size)
+    if tile_count > 1 and tile_width < small_width and tile_height < small_height:
+        return "resize_once"
+    return "per_tile"
+
+
+class SplitCancelled(Exception):
+    """Raised inside a split once its CancelToken has been cancelled."""
+
+
+class CancelToken:
+    """Cooperative cancellation flag for a batch.
+
+    The engine checks it between tiles and on every block read while a
+    source is decoded, so a cancelled split stops within a tile or a read
+    block instead of finishing the image. Pool workers see it through a
+    multiprocessing event registered with share().
+    """
+    def __init__(self, event=None):
+        self._event = event or threading.Event()
+        self._shared = []
+
+    def cancel(self):
+        self._event.set()
+        for event in self._shared:
+            event.set()
+
+    @property
+    def cancelled(self):
+        return self._event.is_set()
+
+    def check(self):
+        """Raise SplitCancelled if cancel() has been called."""
+        if self._event.is_set():
+            raise SplitCancelled()
+
+    def share(self, event):
+        """Set event too when this token is cancelled."""
+        self._shared.append(event)
+        if self.cancelled:
+            event.set()
+
+
+class _CancellableReader:
+    """File wrapper that checks a CancelToken before every read.
+
+    Pillow pulls compressed data through read() in blocks while it decodes,
+    so this lets a long decode stop part-way through.
+    """
+    def __init__(self, handle, cancel_token):
+        self._handle = handle
+        self._cancel_token = cancel_token
+
+    def read(self, *args):
+        self._cancel_token.check()
+        return self._handle.read(*args)
+
+    def __getattr__(self, name):
+        return getattr(self._handle, name)
+
+
+@contextmanager
+def _open_source(source, cancel_token=None):
+    """Open a path or file object as an image, closing it afterwards.
+
+    With a cancel_token, every read made while decoding checks it first.
+    """
+    handle = None
+    name = os.fspath(source) if isinstance(source, (str, Path)) else None
+    if cancel_token is not None:
+        if name is not None:
+            source = handle = open(source, "rb")
+        source = _CancellableReader(source, cancel_token)
+    try:
+        with stage("open"):
+            try:
+                img = Image.open(source)
+            except Image.UnidentifiedImageError:
+                # Pillow names the file object it was given, e.g. the reader wrapper.
+                raise Image.UnidentifiedImageError(
+                    f"cannot identify image file {name!r}" if name else "cannot identify image file"
+                ) from None
+        with img:
+            yield img
+    finally:
+        if handle is not None:
+            handle.close()
+
+
+def create_output_folder(image_path, custom_folder, images_across, images_high, timestamp):
+    """Create output folder using pathlib for cross-platform compatibility."""
+    image_path = Path(image_path)
+    base_name = image_path.stem
+    source_directory = image_path.parent
+
+    if images_across == 1 and images_high == 1:
+        if custom_folder:
+            output_folder = source_directory / custom_folder / timestamp
+        else:
+            output_folder = source_directory / timestamp
+    else:
+        if custom_folder:
+            output_folder = source_directory / custom_folder / base_name
+        else:
+            output_folder = source_directory / base_name
+
+    with stage("mkdir"):
+        output_folder.mkdir(parents=True, exist_ok=True)
+    return output_folder
+
+
+def _decode_factor(img, target_width, target_height, oversample=DECODE_OVERSAMPLE):
+    """Set up reduced decoding of img and return the reduce() factor still to apply.
+
+    JPEG sources are switched to DCT-scaled decoding and need no further
+    reduction, so the factor is 1 for them.
+    """
+    want_width = max(1, target_width * oversample)
+    want_height = max(1, target_height * oversample)
+    if img.format == "JPEG":
+        img.draft(None, (want_width, want_height))
+        return 1
+    return min(img.width // want_width, img.height // want_height)
+
+
+def plan_decode(img, target_width, target_height, oversample=DECODE_OVERSAMPLE):
+    """Decode an opened image at the smallest resolution that covers the target.
+
+    The decoded image keeps at least ``oversample`` source pixels per
+    output pixel on each axis so the final filter still has real detail
+    to work with. JPEG sources use DCT-scaled decoding through draft(), which
+    must happen before the pixels are loaded; other formats are decoded in
+    full and shrunk by an integer factor with reduce(), after which the
+    full-size original is closed to release its pixels. Returns the image to
+    read pixels from, which may be a new object.
+    """
+    factor = _decode_factor(img, target_width, target_height, oversample)
+    if factor >= 2:
+        try:
+            reduced = img.reduce(factor)
+        except ValueError:
+            # Modes such as "P" and "1" cannot be reduced; decode them as-is.
+            return img
+        img.close()
+        return reduced
+    return img
+
+
+def _cell_box(col, row, small_width, small_height, scale, y_offset=0):
+    """Return the box of a grid cell in decoded-image coordinates."""
+    scale_x, scale_y = scale
+    return (col * small_width * scale_x, row * small_height * scale_y - y_offset,
+            (col + 1) * small_width * scale_x, (row + 1) * small_height * scale_y - y_offset)
+
+
+class _PixelBuffer:
+    """Decodes an image into one contiguous buffer and hands out views of it.
+
+    Pillow normally decodes into memory it manages itself, and crop() copies
+    every cell out of it. Decoding into an anonymous memory map instead
+    lets each grid cell be mapped as a strided view onto the decoded
+    pixels, so the resampler reads the source in place. Views share the
+    mapping, which is released when the last of them and the image are
+    gone.
+    """
+    def __init__(self, img):
+        self.pixel_bytes = _pixel_bytes(img.mode)
+        self.stride = img.width * self.pixel_bytes
+        # One spare row: a view's extent is checked as offset + height * stride
+        # even though its last row ends well before that.
+        self._mapping = mmap.mmap(-1, (img.height + 1) * self.stride)
+        self._core = Image.core.map_buffer(self._mapping, img.size, "raw", 0, (img.mode, self.stride, 1))
+        img.im = self._core
+        self.img = img
+
+    @classmethod
+    def decode(cls, img):
+        """Load img into a new buffer; returns None if Pillow decoded it elsewhere."""
+        pixels = None
+        # A pending tile list means the pixels have not been decoded yet.
+        # Palette images keep their palette in Pillow's own image object,
+        # which views would not share; they are cropped as before.
+        if img.tile and img.mode not in ("P", "PA") and img.width and img.height:
+            try:
+                pixels = cls(img)
+            except (AttributeError, ValueError, TypeError, OSError):
+                pixels = None
+        img.load()
+        if pixels is not None and img.im is not pixels._core:
+            # E.g. uncompressed files Pillow maps straight from disk.
+            pixels = None
+        return pixels
+
+    def view(self, box):
+        """Return the pixels in box as an image sharing this buffer, or None."""
+        left, top, right, bottom = box
+        if left < 0 or top < 0 or right > self.img.width or bottom > self.img.height:
+            return None
+        offset = top * self.stride + left * self.pixel_bytes
+        try:
+            core = Image.core.map_buffer(self._mapping, (right - left, bottom - top), "raw", offset,
+                                         (self.img.mode, self.stride, 1))
+            return self.img._new(core)
+        except (AttributeError, TypeError, ValueError):
+            # map_buffer() and _new() are Pillow internals; crop() if they change.
+            return None
+
+
+def _image_bytes(img):
+    return img.width * img.height * _pixel_bytes(img.mode)
+
+
+def _crop(img, box, pixels=None):
+    """Return a grid cell of img, as a view onto ``pixels`` when possible."""
+    box = tuple(round(edge) for edge in box)
+    cell = pixels.view(box) if pixels is not None else None
+    if cell is None:
+        cell = img.crop(box)
+        add_allocation("crop", _image_bytes(cell), copied=True)
+    return cell
+
+
+def _prepare_source(img, images_across, images_high, output_size, maintain_format,
+                    resample_tier=DEFAULT_RESAMPLE):
+    """Work out the grid of an opened source and decode it for splitting.
+
+    Returns ``(decoded, small_width, small_height, img_format, scale,
+    pixels)``; see _iter_tiles() for how these are used. ``pixels`` is a
+    _PixelBuffer holding ``decoded`` when it could be decoded into one.
+    """
+    img_width, img_height = img.size
+    small_width = img_width // images_across
+    small_height = img_height // images_high
+    img_format = img.format if maintain_format else "JPEG"
+
+    tile_width, tile_height = target_dimensions(small_width, small_height, output_size)
+    with stage("decode"):
+        decoded = plan_decode(img, tile_width * images_across, tile_height * images_high,
+                              RESAMPLE_TIERS[resample_tier]["oversample"])
+        # A reduce()d image is already a new buffer, a quarter of the size or less.
+        pixels = _PixelBuffer.decode(decoded) if decoded is img else None
+        decoded.load()
+    add_allocation("decode", _image_bytes(decoded))
+    scale = (decoded.width / img_width, decoded.height / img_height)
+    return decoded, small_width, small_height, img_format, scale, pixels
+
+
+def _iter_tiles(img, images_across, rows, small_width, small_height, output_size,
+                y_offset=0, tiling="auto", scale=(1.0, 1.0), pixels=None, resample_tier=DEFAULT_RESAMPLE):
+    """Yield ``(count, tile)`` for the given grid rows of an opened image.
+
+    ``small_width``/``small_height`` are the grid cell size in the original
+    source; ``scale`` maps them onto ``img`` when it was decoded at reduced
+    resolution. ``y_offset`` is the top edge of ``img`` within the decoded
+    source, so a band cropped out of a larger image keeps the original tile
+    numbering. With ``pixels``, the _PixelBuffer holding ``img``, per-tile
+    cells are resampled from views of it rather than from copies.
+    ``resample_tier`` names one of RESAMPLE_TIERS.
+    """
+    tile_width, tile_height = target_dimensions(small_width, small_height, output_size)
+    tiling = choose_tiling(small_width, small_height, output_size,
+                           images_across * len(rows), tiling)
+    if tiling == "resize_once":
+        left, top, _, _ = _cell_box(0, rows.start, small_width, small_height, scale, y_offset)
+        _, _, right, bottom = _cell_box(images_across - 1, rows.stop - 1, small_width, small_height,
+                                        scale, y_offset)
+        with stage("resize"):
+            resized = resample(img, (tile_width * images_across, tile_height * len(rows)),
+                               resample_tier, box=(left, top, right, bottom))
+        add_allocation("resize", _image_bytes(resized))
+
+    for row in rows:
+        for col in range(images_across):
+            if tiling == "resize_once":
+                left = col * tile_width
+                upper = (row - rows.start) * tile_height
+                with stage("crop"):
+                    if images_across == 1 and len(rows) == 1:
+                        small_img = resized
+                    else:
+                        small_img = resized.crop((left, upper, left + tile_width, upper + tile_height))
+                        add_allocation("crop", _image_bytes(small_img), copied=True)
+            else:
+                box = _cell_box(col, row, small_width, small_height, scale, y_offset)
+                with stage("crop"):
+                    small_img = _crop(img, box, pixels)
+                with stage("resize"):
+                    small_img = resample(small_img, (tile_width, tile_height), resample_tier)
+                add_allocation("resize", _image_bytes(small_img))
+
+            yield row * images_across + col + 1, small_img
+
+
+def _pixel_bytes(mode):
+    """Bytes per pixel Pillow uses in memory for an image mode."""
+    if mode in ("1", "L", "P"):
+        return 1
+    if mode.startswith("I;16"):
+        return 2
+    return 4
+
+
+def _exceeds_memory(img, max_memory_mb):
+    """Return True if img decoded in full would need more than max_memory_mb."""
+    if not max_memory_mb:
+        return False
+    return img.width * img.height * _pixel_bytes(img.mode) > max_memory_mb * 1024 * 1024
+
+
+class _BandSource:
+    """Reads horizontal bands of an opened source without holding all of it.
+
+    Sources stored as one uncompressed strip (most BMPs) are read band by
+    band straight from the file. Other formats cannot be decoded partially,
+    so they are decoded once into a memory-mapped temporary file: the pixels
+    then live in page cache the kernel can write back and reclaim rather than
+    on the heap, and each band is dropped from the resident set once it has
+    been copied out. With ``in_memory`` the source is decoded normally.
+    """
+    def __init__(self, img, in_memory=False):
+        self.img = img
+        self._strip = None if in_memory else self._raw_strip(img)
+        self._mapping = None
+        self._spill = None
+        if in_memory:
+            img.load()
+        elif self._strip is None:
+            self._decode_to_mapping()
+
+    @staticmethod
+    def _raw_strip(img):
+        if len(img.tile) != 1 or img.fp is None:
+            return None
+        codec, extents, offset, args = img.tile[0]
+        if codec != "raw" or tuple(extents) != (0, 0) + img.size:
+            return None
+        if not isinstance(args, tuple) or len(args) < 3:
+            return None
+        rawmode, stride, orientation = args[:3]
+        if stride <= 0 or orientation not in (1, -1):
+            return None
+        return offset, rawmode, stride, orientation
+
+    def _decode_to_mapping(self):
+        img = self.img
+        size = img.width * img.height * _pixel_bytes(img.mode)
+        # The spill file goes to the temp directory ($TMPDIR); it only saves
+        # memory if that is on disk rather than tmpfs.
+        self._spill = tempfile.TemporaryFile(prefix="splitter_", suffix=".raw")
+        self._spill.truncate(size)
+        self._mapping = mmap.mmap(self._spill.fileno(), size)
+        # Pillow decodes into an existing core image of the right mode and
+        # size, so pointing it at the mapping makes it decode straight to disk.
+        try:
+            img.im = Image.core.map_buffer(self._mapping, img.size, "raw", 0, (img.mode, 0, 1))
+        except (AttributeError, TypeError, ValueError):
+            # map_buffer() is a Pillow internal; decode into memory if it changes.
+            self._mapping.close()
+            self._spill.close()
+            self._mapping = self._spill = None
+            img.load()
+            return
+        img.load()
+        self._release(0, size)
+
+    def _release(self, start, end):
+        """Drop the mapped pages in [start, end) from this process's resident set."""
+        if not hasattr(self._mapping, "madvise") or not hasattr(mmap, "MADV_DONTNEED"):
+            return
+        start -= start % mmap.PAGESIZE
+        if end > start:
+            self._mapping.madvise(mmap.MADV_DONTNEED, start, end - start)
+
+    def read(self, top, bottom):
+        """Return source rows [top, bottom) as a new image."""
+        img = self.img
+        if self._strip is not None:
+            offset, rawmode, stride, orientation = self._strip
+            first = top if orientation == 1 else img.height - bottom
+            img.fp.seek(offset + first * stride)
+            data = img.fp.read((bottom - top) * stride)
+            band = Image.frombytes(img.mode, (img.width, bottom - top), data,
+                                   "raw", rawmode, stride, orientation)
+            if img.palette is not None:
+                band.putpalette(img.palette.palette, img.palette.rawmode or img.palette.mode)
+            return band
+
+        band = img.crop((0, top, img.width, bottom))
+        if self._mapping is not None:
+            row_bytes = img.width * _pixel_bytes(img.mode)
+            self._release(top * row_bytes, bottom * row_bytes)
+        return band
+
+    def close(self):
+        if self._mapping is not None:
+            # The core image exports the mapping's buffer; release it first.
+            self.img.close()
+            self._mapping.close()
+            self._spill.close()
+            self._mapping = self._spill = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def _can_reduce(mode):
+    try:
+        Image.new(mode, (2, 2)).reduce(2)
+    except ValueError:
+        return False
+    return True
+
+
+def _iter_banded_tiles(img, images_across, images_high, output_size, tiling, max_memory_mb,
+                       resample_tier=DEFAULT_RESAMPLE):
+    """Yield ``(count, tile)`` for an opened source, one band of grid rows at a time.
+
+    Each band holds as many grid rows as fit in LOW_MEMORY_BAND_SHARE of
+    ``max_memory_mb`` (at least one). Bands are decoded at the same reduced
+    resolution as a full decode and aligned to the reduce() factor, so
+    per-tile output is identical to splitting the whole image; resize_once
+    only clamps at band edges, as it does for pool bands. Palette sources
+    are the exception: their nearest-neighbour resize_once may pick a
+    neighbouring source row anywhere in the band.
+    """
+    img_width, img_height = img.size
+    small_width = img_width // images_across
+    small_height = img_height // images_high
+    tile_width, tile_height = target_dimensions(small_width, small_height, output_size)
+
+    factor = _decode_factor(img, tile_width * images_across, tile_height * images_high,
+                            RESAMPLE_TIERS[resample_tier]["oversample"])
+    if factor < 2 or not _can_reduce(img.mode):
+        factor = 1
+    # JPEG draft() may have shrunk the image; map the grid onto what is decoded.
+    source_width, source_height = img.size
+    decoded_width = -(-source_width // factor)
+    decoded_height = -(-source_height // factor)
+    scale = (decoded_width / img_width, decoded_height / img_height)
+
+    row_bytes = small_height * source_height / img_height * source_width * _pixel_bytes(img.mode)
+    budget = max_memory_mb * 1024 * 1024 * LOW_MEMORY_BAND_SHARE
+    rows_per_band = max(1, int(budget // max(1, row_bytes)))
+    in_memory = not _exceeds_memory(img, max_memory_mb)
+
+    with stage("decode"):
+        source = _BandSource(img, in_memory=in_memory)
+    with source:
+        for first in range(0, images_high, rows_per_band):
+            rows = range(first, min(first + rows_per_band, images_high))
+            top = math.floor(rows.start * small_height * scale[1])
+            bottom = min(decoded_height, math.ceil(rows.stop * small_height * scale[1]))
+            with stage("decode"):
+                band = source.read(top * factor, min(source_height, bottom * factor))
+                add_allocation("decode", _image_bytes(band), copied=True)
+                if factor >= 2:
+                    band = band.reduce(factor)
+                    add_allocation("decode", _image_bytes(band))
+            yield from _iter_tiles(band, images_across, rows, small_width, small_height, output_size,
+                                   y_offset=top, tiling=tiling, scale=scale, resample_tier=resample_tier)
+            del band
+
+
+def _iter_source_tiles(img, images_across, images_high, output_size, maintain_format,
+                       tiling="auto", max_memory_mb=None, resample_tier=DEFAULT_RESAMPLE):
+    """Decode an opened source and yield ``(count, tile)`` for its whole grid.
+
+    With ``max_memory_mb`` set, a source that would need more than that
+    decoded in full is split band by band; see _iter_banded_tiles().
+    """
+    if _exceeds_memory(img, max_memory_mb):
+        yield from _iter_banded_tiles(img, images_across, images_high, output_size, tiling,
+                                      max_memory_mb, resample_tier)
+        return
+    decoded, small_width, small_height, _, scale, pixels = _prepare_source(
+        img, images_across, images_high, output_size, maintain_format, resample_tier
+    )
+    yield from _iter_tiles(decoded, images_across, range(images_high), small_width, small_height,
+                           output_size, tiling=tiling, scale=scale, pixels=pixels,
+                           resample_tier=resample_tier)
+
+
+def encoder_options(img_format, encoder=DEFAULT_ENCODER, quality=None):
+    """Return the Image.save() keyword arguments for a format and preset."""
+    options = dict(ENCODER_PRESETS[encoder].get(img_format, {}))
+    if quality is not None and img_format in ("JPEG", "WEBP"):
+        options["quality"] = quality
+    return options
+
+
+def _tile_path(output_folder, image_path, count, img_format):
+    return output_folder / f"{Path(image_path).stem}_part_{count}.{img_format.lower()}"
+
+
+def _storable(small_img, img_format):
+    """Return small_img in a mode img_format can store."""
+    if img_format == "JPEG" and small_img.mode not in JPEG_MODES:
+        small_img = small_img.convert("RGB")
+        add_allocation("save", _image_bytes(small_img), copied=True)
+    return small_img
+
+
+def _save_tile(small_img, output_path, img_format, save_options=None):
+    """Encode and write one tile, attributing the bytes written when profiling."""
+    with stage("save"):
+        _storable(small_img, img_format).save(output_path, img_format, **(save_options or {}))
+    if get_profiler() is not None:
+        add_bytes("save", output_path.stat().st_size)
+
+
+def _encode_tile(small_img, img_format, save_options=None):
+    """Encode one tile into bytes for an output sink."""
+    buffer = io.BytesIO()
+    with stage("save"):
+        _storable(small_img, img_format).save(buffer, img_format, **(save_options or {}))
+    add_bytes("save", buffer.tell())
+    return buffer.getvalue()
+
+
+def _write_to_sink(sink, job, count, img_format, data):
+    """Hand one encoded tile to sink and return the file it went into."""
+    with stage("write", len(data)):
+        return sink.add(job, count, img_format, data)
+
+
+class Tile:
+    """One tile from iter_tiles(): its place in the grid and its pixels or bytes.
+
+    ``count`` numbers tiles from 1, row by row, as in the tile file names;
+    ``row`` and ``column`` count from 0. ``image`` is a PIL image, or None
+    for encoded tiles, whose file in ``format`` is in ``data`` instead.
+    """
+    __slots__ = ("count", "row", "column", "format", "image", "data")
+
+    def __init__(self, count, row, column, img_format, image=None, data=None):
+        self.count = count
+        self.row = row
+        self.column = column
+        self.format = img_format
+        self.image = image
+        self.data = data
+
+    def __repr__(self):
+        kind = f"{len(self.data)} bytes" if self.image is None else f"{self.image.width}x{self.image.height}"
+        return f"<Tile {self.count} at row {self.row}, column {self.column}: {self.format}, {kind}>"
+
+
+def iter_tiles(source, images_across, images_high, output_size, maintain_format=False, tiling="auto",
+               max_memory_mb=None, cancel_token=None, encoder=DEFAULT_ENCODER, quality=None,
+               resample_tier=DEFAULT_RESAMPLE, encode=False):
+    """Split an image in memory, yielding a Tile for each grid cell as it is made.
+
+    ``source`` is a path, the image file's bytes, or a binary file object,
+    which is read but not closed. Nothing is written anywhere, except that
+    with ``max_memory_mb`` a very large source may be decoded into an
+    anonymous temporary file. Tiles come as PIL images, or with
+    ``encode`` as bytes encoded with ``encoder`` and ``quality``. The
+    other settings are as for split_and_resize_image(). The source stays
+    open until the generator is exhausted or closed.
+    """
+    # Source bytes count toward "decode" only when read from disk here; the
+    # caller already accounted for bytes it read itself.
+    size = None
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        source = io.BytesIO(source)
+    elif isinstance(source, (str, os.PathLike)):
+        source = Path(source)
+        if get_profiler() is not None:
+            size = source.stat().st_size
+    with _open_source(source, cancel_token) as img:
+        if size is not None:
+            add_bytes("decode", size)
+        img_format = img.format if maintain_format else "JPEG"
+        save_options = encoder_options(img_format, encoder, quality)
+        tiles = _iter_source_tiles(img, images_across, images_high, output_size, maintain_format,
+                                   tiling, max_memory_mb, resample_tier)
+        for count, small_img in tiles:
+            if cancel_token is not None:
+                cancel_token.check()
+            row, column = divmod(count - 1, images_across)
+            if encode:
+                yield Tile(count, row, column, img_format, data=_encode_tile(small_img, img_format, save_options))
+            else:
+                yield Tile(count, row, column, img_format, image=small_img)
+
+
+def split_and_resize_image(image_path, images_across, images_high, output_size, custom_folder, maintain_format, timestamp, progress_callback=None, tiling="auto", max_memory_mb=None, cancel_token=None, encoder=DEFAULT_ENCODER, quality=None, resample_tier=DEFAULT_RESAMPLE):
+    """Split and resize image with optional progress callback.
+
+    ``tiling`` selects the resampling path; see choose_tiling(). With
+    ``max_memory_mb``, sources too large to decode within that many MB are
+    split band by band. A cancelled ``cancel_token`` raises SplitCancelled
+    between tiles or during decoding. ``encoder`` names one of
+    ENCODER_PRESETS and ``quality`` overrides its JPEG/WebP quality.
+    ``resample_tier`` names one of RESAMPLE_TIERS.
+    Returns the paths of the written tiles.
+    """
+    output_folder = create_output_folder(image_path, custom_folder, images_across, images_high, timestamp)
+    image_path = Path(image_path)
+    total_parts = images_across * images_high
+
+    written = []
+    for tile in iter_tiles(image_path, images_across, images_high, output_size, maintain_format, tiling,
+                           max_memory_mb, cancel_token, resample_tier=resample_tier):
+        output_path = _tile_path(output_folder, image_path, tile.count, tile.format)
+        _save_tile(tile.image, output_path, tile.format, encoder_options(tile.format, encoder, quality))
+        written.append(output_path)
+
+        if progress_callback:
+            progress_callback(tile.count, total_parts)
+    return written
+
+
+class SplitJob:
+    """A single source image together with its effective split settings."""
+    def __init__(self, image_path, images_across, images_high, output_size, custom_folder, maintain_format,
+                 tiling="auto", max_memory_mb=None, encoder=DEFAULT_ENCODER, quality=None,
+                 resample_tier=DEFAULT_RESAMPLE):
+        self.image_path = Path(image_path)
+        self.images_across = images_across
+        self.images_high = images_high
+        self.output_size = output_size
+        self.custom_folder = custom_folder
+        self.maintain_format = maintain_format
+        self.tiling = tiling
+        self.encoder = encoder
+        self.quality = quality
+        self.resample_tier = resample_tier
+        # How the image is split, not what comes out; left out of settings().
+        self.max_memory_mb = max_memory_mb
+        self.skipped = False
+        # The earlier job with the same content and settings, if any.
+        self.duplicate_of = None
+
+    def settings(self):
+        """Return the settings that determine this job's output."""
+        settings = {
+            "size": self.output_size,
+            "across": self.images_across,
+            "high": self.images_high,
+            "format": "source" if self.maintain_format else "JPEG",
+            "folder": self.custom_folder or "",
+            "tiling": self.tiling,
+            # Always recorded: the default tier enlarges differently from the
+            # resampling used before tiers existed, so older outputs are stale.
+            "resample": self.resample_tier,
+        }
+        # Only recorded when they differ from the defaults, so manifests
+        # written before presets existed still match; the default preset
+        # produces the same bytes as before.
+        if self.encoder != DEFAULT_ENCODER:
+            settings["encoder"] = self.encoder
+        if self.quality is not None:
+            settings["quality"] = self.quality
+        return settings
+
+    def save_options(self, img_format):
+        """Return the encoder arguments for this job's tiles in img_format."""
+        return encoder_options(img_format, self.encoder, self.quality)
+
+    def run(self, timestamp, progress_callback=None, cancel_token=None):
+        """Split this image in the current process and return the tile paths."""
+        return split_and_resize_image(str(self.image_path), self.images_across, self.images_high,
+                                      self.output_size, self.custom_folder, self.maintain_format,
+                                      timestamp, progress_callback, self.tiling, self.max_memory_mb,
+                                      cancel_token, self.encoder, self.quality, self.resample_tier)
+
+
+class OutputManifest:
+    """Records what was produced from each source so unchanged work is skipped.
+
+    A manifest file lives in every source directory and maps each source
+    file name to its fingerprint (size, mtime and, with ``use_hash``, a
+    SHA-256 of its content), the settings it was split with and the tiles
+    that were written. A job is current when all three still match and the
+    tiles still exist. With ``use_hash`` a file whose mtime changed but whose
+    content did not is also treated as current.
+    """
+    def __init__(self, use_hash=False):
+        self.use_hash = use_hash
+        self._manifests = {}
+        self._dirty = set()
+
+    def _entries(self, directory):
+        if directory not in self._manifests:
+            entries = {}
+            manifest_path = directory / MANIFEST_NAME
+            if manifest_path.exists():
+                try:
+                    with manifest_path.open("r", encoding="utf-8") as handle:
+                        data = json.load(handle)
+                    if data.get("version") == MANIFEST_VERSION:
+                        entries = data.get("images", {})
+                except (OSError, ValueError) as exc:
+                    print(f"Warning: Ignoring unreadable manifest {manifest_path}: {exc}")
+            self._manifests[directory] = entries
+        return self._manifests[directory]
+
+    def _hash(self, path):
+        digest = hashlib.sha256()
+        with open(path, "rb") as handle:
+            for chunk in iter(lambda: handle.read(1024 * 1024), b""):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    def is_current(self, job):
+        """Return True if job's outputs are up to date with its source and settings."""
+        path = job.image_path
+        entry = self._entries(path.parent).get(path.name)
+        if not entry or entry.get("settings") != job.settings():
+            return False
+        try:
+            stat = path.stat()
+        except OSError:
+            return False
+        if stat.st_size != entry.get("size"):
+            return False
+        if stat.st_mtime_ns != entry.get("mtime_ns"):
+            if not self.use_hash or entry.get("sha256") != self._hash(path):
+                return False
+            entry["mtime_ns"] = stat.st_mtime_ns
+            self._dirty.add(path.parent)
+        return all((path.parent / output).exists() for output in entry.get("outputs", []))
+
+    def record(self, job, outputs):
+        """Store the fingerprint, settings and outputs of a finished job."""
+        path = job.image_path
+        stat = path.stat()
+        entry = {
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "settings": job.settings(),
+            # A sink returns the same shard for many tiles; list each once.
+            "outputs": [os.path.relpath(output, path.parent) for output in dict.fromkeys(outputs)],
+        }
+        if self.use_hash:
+            entry["sha256"] = self._hash(path)
+        self._entries(path.parent)[path.name] = entry
+        self._dirty.add(path.parent)
+
+    def save(self):
+        """Write every changed manifest back to its source directory."""
+        for directory in list(self._dirty):
+            manifest_path = directory / MANIFEST_NAME
+            temp_path = manifest_path.with_name(f"{MANIFEST_NAME}.{os.getpid()}.tmp")
+            data = {"version": MANIFEST_VERSION, "images": self._manifests[directory]}
+            try:
+                with temp_path.open("w", encoding="utf-8") as handle:
+                    json.dump(data, handle, indent=1)
+                os.replace(temp_path, manifest_path)
+            except OSError as exc:
+                print(f"Warning: Failed to write manifest {manifest_path}: {exc}")
+                continue
+            self._dirty.discard(directory)
+
+
+class _Fingerprint:
+    """A source file's size, with partial and full hashes computed on demand."""
+    __slots__ = ("path", "size", "_partial", "_full")
+
+    def __init__(self, path, size):
+        self.path = path
+        self.size = size
+        self._partial = None
+        self._full = None
+
+    def partial(self):
+        if self._partial is None:
+            if self.size <= 2 * DEDUP_PARTIAL_BYTES:
+                self._partial = self.full()
+            else:
+                digest = hashlib.sha256()
+                with open(self.path, "rb") as handle:
+                    digest.update(handle.read(DEDUP_PARTIAL_BYTES))
+                    handle.seek(-DEDUP_PARTIAL_BYTES, os.SEEK_END)
+                    digest.update(handle.read(DEDUP_PARTIAL_BYTES))
+                self._partial = digest.hexdigest()
+        return self._partial
+
+    def full(self):
+        if self._full is None:
+            digest = hashlib.sha256()
+            with open(self.path, "rb") as handle:
+                for chunk in iter(lambda: handle.read(1024 * 1024), b""):
+                    digest.update(chunk)
+            self._full = digest.hexdigest()
+        return self._full
+
+    def matches(self, other):
+        return self.partial() == other.partial() and self.full() == other.full()
+
+
+class SourceDeduplicator:
+    """Splits each distinct source content once per settings and reuses its tiles.
+
+    Only sources whose size matches an earlier one's with the same output
+    settings are hashed: first DEDUP_PARTIAL_BYTES from each end, then, if
+    those match, the whole file. A job whose content matches an earlier job's
+    is not decoded at all; its tiles are made from the earlier job's as
+    hardlinks (``mode`` "link", falling back to copies where the file system
+    refuses) or copies (``mode`` "copy"). The counters describe the work
+    saved; see summary().
+    """
+    def __init__(self, mode="link"):
+        self.mode = mode
+        self.duplicates = 0
+        self.source_bytes = 0
+        self.tiles = 0
+        self.tile_bytes = 0
+        self.linked = 0
+        self.copied = 0
+        self._groups = {}  # (settings, size) -> [(_Fingerprint, SplitJob)]
+        self._outputs = {}  # id(SplitJob) -> tile paths of a finished original
+
+    def original_of(self, job):
+        """Return the earlier job with the same content and output settings, or None.
+
+        Jobs without one are remembered as originals for later ones.
+        """
+        settings = job.settings()
+        # Where the tiles go doesn't change what is in them.
+        del settings["folder"]
+        fingerprint = _Fingerprint(job.image_path, job.image_path.stat().st_size)
+        candidates = self._groups.setdefault((json.dumps(settings, sort_keys=True), fingerprint.size), [])
+        for candidate, original in candidates:
+            if candidate.matches(fingerprint):
+                return original
+        candidates.append((fingerprint, job))
+        return None
+
+    def finished(self, job, outputs):
+        """Remember the tiles an original job produced."""
+        self._outputs[id(job)] = tuple(outputs)
+
+    def materialize(self, job, timestamp):
+        """Make job's tiles from its original's and return their paths.
+
+        Returns None if the original produced no tiles this run.
+        """
+        sources = self._outputs.get(id(job.duplicate_of))
+        if sources is None:
+            return None
+        output_folder = create_output_folder(job.image_path, job.custom_folder,
+                                             job.images_across, job.images_high, timestamp)
+        original_stem, stem = job.duplicate_of.image_path.stem, job.image_path.stem
+        outputs = []
+        for source in sources:
+            source = Path(source)
+            target = output_folder / (stem + source.name[len(original_stem):])
+            if target != source:
+                self._place(source, target)
+            outputs.append(target)
+            self.tiles += 1
+            self.tile_bytes += target.stat().st_size
+        self.duplicates += 1
+        self.source_bytes += job.image_path.stat().st_size
+        return outputs
+
+    def _place(self, source, target):
+        with stage("write"):
+            if self.mode == "link":
+                try:
+                    target.unlink(missing_ok=True)
+                    os.link(source, target)
+                    self.linked += 1
+                    return
+                except OSError:
+                    pass  # e.g. another file system; copy instead
+            shutil.copyfile(source, target)
+            self.copied += 1
+
+    def summary(self):
+        """Describe the work saved, or return "" if there were no duplicates."""
+        if not self.duplicates:
+            return ""
+        return (f"Reused the tiles of {self.duplicates} duplicate image(s): {self.tiles} tile(s), "
+                f"{self.tile_bytes / (1024 * 1024):.1f} MB, as {self.linked} hardlink(s) and "
+                f"{self.copied} copy(ies); {self.source_bytes / (1024 * 1024):.1f} MB of source "
+                f"not decoded.")
+
+
+class BatchResult:
+    """Outcome of a batch run: completed, skipped and failed jobs."""
+    def __init__(self):
+        self.completed = []
+        self.skipped = []
+        self.errors = []  # List of (SplitJob, error message) tuples
+        self.cancelled = False
+
+    @property
+    def processed(self):
+        return len(self.completed) + len(self.skipped) + len(self.errors)
+
+
+def resolve_workers(workers):
+    """Return the worker count to use; 0 or None means one per CPU core."""
+    if not workers:
+        return os.cpu_count() or 1
+    return max(1, int(workers))
+
+
+def _profiled_call(profile, function, *args):
+    """Run function in a pool worker and return ``(result, stage samples)``.
+
+    The samples are None unless ``profile`` is set; the parent merges them
+    into its own profiler.
+    """
+    if not profile:
+        return function(*args), None
+    profiler = StageProfiler()
+    previous = set_profiler(profiler)
+    try:
+        return function(*args), profiler.data()
+    finally:
+        set_profiler(previous)
+
+
+# Error recorded internally for images interrupted by cancellation; such
+# images are reported neither as completed nor as failed.
+_CANCELLED = "Cancelled"
+
+
+def _error_message(exc):
+    """Describe a failed image; exceptions without a message still count as errors."""
+    return str(exc) or type(exc).__name__
+
+
+# Set in each pool worker by _init_worker() so jobs there see cancellation.
+_worker_cancel_token = None
+
+
+def _init_worker(cancel_event):
+    global _worker_cancel_token
+    _worker_cancel_token = CancelToken(cancel_event)
+
+
+def _encode_job(job, data=None):
+    """Split job into encoded tiles for the parent process's sink.
+
+    ``data`` holds the source's bytes when it isn't read from job.image_path.
+    """
+    tiles = iter_tiles(job.image_path if data is None else data, job.images_across, job.images_high,
+                       job.output_size, job.maintain_format, job.tiling, job.max_memory_mb,
+                       _worker_cancel_token, job.encoder, job.quality, job.resample_tier, encode=True)
+    return [(tile.count, tile.format, tile.data) for tile in tiles]
+
+
+def _run_job(job, timestamp, profile=False, encode=False):
+    """Process-pool entry point for a whole image.
+
+    Returns the tile paths, or with ``encode`` the encoded tiles for a sink.
+    """
+    if encode:
+        return _profiled_call(profile, _encode_job, job)
+    return _profiled_call(profile, job.run, timestamp, None, _worker_cancel_token)
+
+
+def _submit_job(executor, job, timestamp, encode=False):
+    """Submit a whole image to the pool; returns the Future of _run_job().
+
+    Each worker decodes its own image, so the pool spreads a batch across
+    images rather than one image across workers.
+    With ``encode`` the worker returns encoded tiles instead of writing them.
+    """
+    return executor.submit(_run_job, job, timestamp, get_profiler() is not None, encode)
+
+
+def _warm_worker():
+    """Load Pillow's plugins and codecs in a pool worker ahead of its first job."""
+    Image.init()
+    sample = Image.new("RGB", (64, 64))
+    for img_format in ("JPEG", "PNG", "WEBP"):
+        try:
+            sample.resize((32, 32), Image.Resampling.LANCZOS).save(io.BytesIO(), img_format)
+        except (KeyError, OSError):
+            pass  # Codec not built into this Pillow.
+    return os.getpid()
+
+
+class WarmPool:
+    """Worker processes kept running between jobs, for long-lived callers.
+
+    All workers are started, and have Pillow's plugins and codecs loaded,
+    before the constructor returns, so no job pays for process start-up.
+    """
+    def __init__(self, workers=1):
+        # Imported here so single-worker CLI runs don't pay for multiprocessing.
+        import multiprocessing
+        from concurrent.futures import ProcessPoolExecutor
+
+        self.workers = resolve_workers(workers)
+        self._cancel_event = multiprocessing.Event()
+        self._executor = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker,
+                                             initargs=(self._cancel_event,))
+        # Submitted together, so the pool starts one process for each.
+        for future in [self._executor.submit(_warm_worker) for _ in range(self.workers)]:
+            future.result()
+
+    def submit(self, job, timestamp):
+        """Start splitting job; returns a Future of its tile paths."""
+        from concurrent.futures import Future
+
+        part = _submit_job(self._executor, job, timestamp)
+        finished = Future()
+
+        def part_done(_):
+            try:
+                finished.set_result(part.result()[0])
+            except BaseException as e:
+                finished.set_exception(e)
+
+        part.add_done_callback(part_done)
+        return finished
+
+    def encode(self, job, data):
+        """Start splitting an image held in memory, ``data`` being its file's bytes.
+
+        Nothing is read or written on disk; job.image_path is ignored.
+        Returns a Future of ``(count, img_format, tile bytes)`` tuples.
+        """
+        return self._executor.submit(_encode_job, job, data)
+
+    def close(self, cancel=False):
+        """Stop the workers, after the jobs in flight unless ``cancel`` is set."""
+        if cancel:
+            self._cancel_event.set()
+        self._executor.shutdown(wait=True, cancel_futures=cancel)
+
+
+def run_batch(jobs, timestamp, workers=1, progress_callback=None, should_continue=None,
+              manifest=None, cancel_token=None, tile_callback=None, sink=None, dedupe=None):
+    """Split every job, optionally across a pool of worker processes.
+
+    ``jobs`` may be any iterable, including a lazy generator; it is consumed
+    as work is submitted. ``progress_callback(done, total, job, error)`` is
+    called once per image in submission order; ``total`` is None when jobs
+    has no length, and ``error`` is ``None`` on success or the error message.
+    A failing image is recorded in the result instead of aborting the batch.
+    ``should_continue`` is polled between images; returning False cancels.
+    A CancelToken cancels sooner: images being split stop between tiles or
+    during decoding, and are reported neither as completed nor as failed.
+    ``tile_callback(job, written, total)`` is called after tiles are written,
+    per tile with one worker and per finished image or band with a pool.
+    With an OutputManifest, jobs whose outputs are current are not split
+    again; they are reported with ``job.skipped`` set. With a ``sink`` (see
+    splitter_sinks), tiles are encoded to bytes and handed to it by this
+    thread, one at a time and in order, instead of each being written to its
+    own file; its outputs are the files the sink returns. With a
+    SourceDeduplicator, jobs whose source content and settings match an
+    earlier job's reuse its tiles instead of being split; this needs the
+    directory layout, so it cannot be combined with a sink.
+    """
+    if sink is not None and dedupe is not None:
+        raise ValueError("Deduplication links tile files, so it cannot be combined with a sink")
+    total = len(jobs) if hasattr(jobs, "__len__") else None
+    workers = resolve_workers(workers)
+    result = BatchResult()
+    if cancel_token is None:
+        cancel_token = CancelToken()
+
+    def keep_going():
+        if should_continue and not should_continue():
+            cancel_token.cancel()
+        if cancel_token.cancelled:
+            result.cancelled = True
+        return not result.cancelled
+
+    def needs_no_split(job):
+        # Called as jobs are submitted: current outputs, or a duplicate's.
+        if manifest is not None:
+            try:
+                job.skipped = manifest.is_current(job)
+            except OSError:
+                job.skipped = False
+            if job.skipped:
+                return True
+        if dedupe is not None:
+            try:
+                job.duplicate_of = dedupe.original_of(job)
+            except OSError:
+                job.duplicate_of = None
+            return job.duplicate_of is not None
+        return False
+
+    def record(job, error, outputs=None):
+        if job.duplicate_of is not None and error is None:
+            # The original was recorded first, since results come in order.
+            try:
+                outputs = dedupe.materialize(job, timestamp)
+            except OSError as e:
+                error = _error_message(e)
+            else:
+                if outputs is None:
+                    if cancel_token.cancelled:
+                        return
+                    error = f"Duplicate of {job.duplicate_of.image_path.name}, which failed"
+        if job.skipped:
+            result.skipped.append(job)
+        elif error is None:
+            result.completed.append(job)
+            if dedupe is not None and job.duplicate_of is None:
+                dedupe.finished(job, outputs)
+            if manifest is not None:
+                try:
+                    manifest.record(job, outputs)
+                except OSError as e:
+                    print(f"Warning: Could not record {job.image_path} in manifest: {e}")
+                if len(result.completed) % MANIFEST_SAVE_INTERVAL == 0:
+                    manifest.save()
+        else:
+            result.errors.append((job, error))
+        if progress_callback:
+            progress_callback(result.processed, total, job, error)
+
+    try:
+        if workers == 1:
+            _run_pipeline(jobs, timestamp, result, record, needs_no_split, keep_going, cancel_token,
+                          tile_callback, sink)
+        else:
+            _run_pool(jobs, timestamp, workers, result, record, needs_no_split, keep_going, cancel_token,
+                      tile_callback, sink)
+    finally:
+        keep_going()
+        if manifest is not None:
+            manifest.save()
+    return result
+
+
+def _streams_from_disk(job):
+    """Return True if job's source file is too big for the pipeline to read ahead."""
+    if not job.max_memory_mb:
+        return False
+    return job.image_path.stat().st_size > job.max_memory_mb * 1024 * 1024 * LOW_MEMORY_BAND_SHARE
+
+
+def _run_pipeline(jobs, timestamp, result, record, needs_no_split, keep_going, cancel_token,
+                  tile_callback=None, sink=None):
+    """Drive run_batch() as three stages joined by bounded queues.
+
+    A reader thread loads source files into memory, a transform thread
+    decodes and resamples them into tiles, and the calling thread encodes
+    and writes the tiles. Pillow releases the GIL while decoding, resampling
+    and encoding, so file reads and tile writes overlap with resampling. The
+    bounded queues apply backpressure so memory stays flat. Every stage
+    passes jobs along in order, so results are still recorded in order.
+    Files too big for a job's memory ceiling are not read ahead; the
+    transform thread opens them from disk instead.
+    """
+    read_queue = queue.Queue(PIPELINE_READ_AHEAD)
+    write_queue = queue.Queue(PIPELINE_TILE_QUEUE)
+    failures = []
+
+    def reader():
+        try:
+            for job in jobs:
+                if not keep_going():
+                    break
+                if needs_no_split(job):
+                    read_queue.put((job, None, None))
+                    continue
+                try:
+                    if _streams_from_disk(job):
+                        # Too big to read ahead; the transform opens it itself.
+                        read_queue.put((job, job.image_path, None))
+                        continue
+                    with stage("read"):
+                        data = job.image_path.read_bytes()
+                    add_bytes("read", len(data))
+                except Exception as e:
+                    read_queue.put((job, None, _error_message(e)))
+                else:
+                    read_queue.put((job, data, None))
+        except BaseException as e:
+            # Enumeration failed (e.g. an unreadable stdin); re-raised below.
+            failures.append(e)
+        finally:
+            read_queue.put(None)
+
+    def transform():
+        while True:
+            item = read_queue.get()
+            if item is None:
+                write_queue.put(None)
+                return
+            job, data, error = item
+            if data is not None:
+                try:
+                    cancel_token.check()
+                    if sink is None:
+                        output_folder = create_output_folder(job.image_path, job.custom_folder,
+                                                             job.images_across, job.images_high, timestamp)
+                    for tile in iter_tiles(data, job.images_across, job.images_high, job.output_size,
+                                           job.maintain_format, job.tiling, job.max_memory_mb, cancel_token,
+                                           resample_tier=job.resample_tier):
+                        output_path = None
+                        if sink is None:
+                            output_path = _tile_path(output_folder, job.image_path, tile.count, tile.format)
+                        write_queue.put((job, tile.count, tile.image, tile.format, output_path))
+                except SplitCancelled:
+                    error = _CANCELLED
+                except Exception as e:
+                    error = _error_message(e)
+            write_queue.put((job, None, None, error, None))
+
+    threads = [threading.Thread(target=wrap_thread(reader), daemon=True),
+               threading.Thread(target=wrap_thread(transform), daemon=True)]
+    for thread in threads:
+        thread.start()
+
+    outputs = []
+    write_error = None
+    while True:
+        item = write_queue.get()
+        if item is None:
+            break
+        job, count, tile, detail, output_path = item
+        if tile is not None:
+            if write_error is None and cancel_token.cancelled:
+                write_error = _CANCELLED
+            if write_error is None:
+                try:
+                    if sink is None:
+                        _save_tile(tile, output_path, detail, job.save_options(detail))
+                    else:
+                        data = _encode_tile(tile, detail, job.save_options(detail))
+                        output_path = _write_to_sink(sink, job, count, detail, data)
+                    outputs.append(output_path)
+                except Exception as e:
+                    write_error = _error_message(e)
+                else:
+                    if tile_callback:
+                        tile_callback(job, len(outputs), job.images_across * job.images_high)
+            continue
+        error = detail or write_error
+        outputs_done, outputs = outputs, []
+        write_error = None
+        if error == _CANCELLED:
+            continue
+        record(job, error, outputs_done)
+
+    for thread in threads:
+        thread.join()
+    if failures:
+        raise failures[0]
+
+
+def _run_pool(jobs, timestamp, workers, result, record, needs_no_split, keep_going, cancel_token,
+              tile_callback=None, sink=None):
+    """Drive run_batch() across a process pool.
+
+    With a sink the workers encode tiles and this process writes them.
+    """
+    # Keep a bounded window of in-flight work and drain it in submission
+    # order, so progress is reported in order and memory stays flat.
+    window = workers * 2
+    pending = deque()
+    in_flight = 0
+    job_iter = iter(jobs)
+    # Imported here so single-worker CLI runs don't pay for multiprocessing.
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor, CancelledError
+
+    cancel_event = multiprocessing.Event()
+    cancel_token.share(cancel_event)
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(cancel_event,)) as executor:
+        while True:
+            while in_flight < window and not result.cancelled:
+                if not keep_going():
+                    break
+                job = next(job_iter, None)
+                if job is None:
+                    break
+                if needs_no_split(job):
+                    # Takes a slot too, so a long run of skipped jobs can't
+                    # grow pending past the window before anything is recorded.
+                    pending.append((job, None))
+                    in_flight += 1
+                    continue
+                try:
+                    future = _submit_job(executor, job, timestamp, sink is not None)
+                except Exception as e:
+                    future = e
+                pending.append((job, future))
+                in_flight += 1
+
+            if not pending:
+                break
+
+            job, future = pending.popleft()
+            in_flight -= 1
+            if isinstance(future, Exception):
+                record(job, _error_message(future))
+                continue
+
+            error = None
+            outputs = []
+            if future is not None:
+                if not keep_going():
+                    future.cancel()
+                try:
+                    tiles, samples = future.result()
+                    if sink is None:
+                        outputs.extend(tiles)
+                    else:
+                        for count, img_format, data in tiles:
+                            outputs.append(_write_to_sink(sink, job, count, img_format, data))
+                    if samples:
+                        get_profiler().merge(samples)
+                    if tile_callback:
+                        tile_callback(job, len(outputs), job.images_across * job.images_high)
+                except (CancelledError, SplitCancelled):
+                    error = _CANCELLED
+                except Exception as e:
+                    error = _error_message(e)
+            if error == _CANCELLED:
+                continue
+            record(job, error, outputs)
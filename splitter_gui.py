@@ -0,0 +1,1641 @@
+"""Tk user interface for the image splitter."""
+import os
+import threading
+import json
+import hashlib
+import time
+import datetime
+from collections import deque, OrderedDict
+from pathlib import Path
+from tkinter import filedialog, StringVar, IntVar, BooleanVar, messagebox, Menu, Toplevel
+from tkinter import ttk
+from tkinter import scrolledtext
+from tkinterdnd2 import DND_FILES
+from PIL import Image, ImageTk, PngImagePlugin
+
+from splitter_engine import (
+    DEFAULT_ENCODER,
+    ENCODER_PRESETS,
+    VALID_EXTENSIONS,
+    CancelToken,
+    OutputManifest,
+    SourceDeduplicator,
+    SplitJob,
+    plan_decode,
+    resolve_workers,
+    run_batch,
+)
+from splitter_profile import StageProfiler, set_profiler
+from splitter_settings import SettingsTable, write_job_file
+
+try:
+    import sv_ttk
+    THEME_AVAILABLE = True
+except ImportError:
+    THEME_AVAILABLE = False
+
+
+TOOLTIP_CONFIG_FILE = Path(__file__).with_name("tooltips.json")
+
+# Preview thumbnails are cached in memory up to this many bytes of pixels,
+# and optionally on disk so they survive restarts.
+PREVIEW_CACHE_BYTES = 64 * 1024 * 1024
+PREVIEW_DISK_CACHE_DIR = Path.home() / ".cache" / "splitter" / "previews"
+PREVIEW_DISK_CACHE_BYTES = 256 * 1024 * 1024
+PREVIEW_PREFETCH = 2
+
+# The image list only creates Treeview rows for what is on screen; the
+# mouse wheel scrolls it this many rows per notch.
+LIST_WHEEL_ROWS = 3
+# Typing in the list filter re-filters after this many quiet milliseconds.
+LIST_FILTER_DELAY_MS = 150
+LIST_FILTERS = {
+    "All images": "all",
+    "Custom settings": "custom",
+    "Pending": "pending",
+    "Done": "done",
+    "Failed": "failed",
+    "Skipped": "skipped",
+}
+
+# Status and progress updates from the processing thread are coalesced and
+# applied at most once per this many milliseconds.
+STATUS_UPDATE_INTERVAL_MS = 50
+
+HELP_TEXT = (
+    "Splitter – User Help Guide\n"
+    "\n"
+    "Splitter is a tool that allows you to divide a single image into multiple smaller images "
+    "using a customizable grid layout. You can also use Splitter to resize images without "
+    "splitting them. This guide explains the layout, features, and workflow of the Splitter "
+    "application.\n"
+    "\n"
+    "✅ Getting Started\n"
+    "When you open Splitter, you are presented with a clean, modern interface designed for "
+    "straightforward image processing.\n"
+    "\n"
+    "Image List Panel (Upper Left)\n"
+    "• Displays the list of images you are working with.\n"
+    "• Add images by clicking Browse Images or by dragging and dropping them into the list.\n"
+    "• Splitter keeps the original file path for each image.\n"
+    "• When processing, a subfolder based on the original file name is created automatically.\n"
+    "\n"
+    "List Management Options\n"
+    "• Clear List – Remove all images from the list.\n"
+    "• Remove Selected – Remove only the highlighted images.\n"
+    "• Filter – Type part of a file name, or pick Custom settings, Pending, Done, Failed or "
+    "Skipped, to narrow the list. The list only draws the rows on screen, so it stays fast "
+    "with very large batches.\n"
+    "\n"
+    "⚙️ Global Default Settings\n"
+    "These settings apply to every image unless you override them per image.\n"
+    "• Base Size – Sets the longest edge (in pixels) while maintaining aspect ratio.\n"
+    "• Custom Base Size – Enter any pixel value to override the base size.\n"
+    "• Across & Height – Define the grid layout (columns × rows).\n"
+    "• Maintain Source Format – Keeps the original file type for the output images.\n"
+    "• Encoder – fast encodes quickest, smallest writes the smallest files, balanced is in between.\n"
+    "• Output Folder – Optional custom subfolder name for generated images.\n"
+    "• Workers – How many images are processed in parallel (defaults to one per CPU core).\n"
+    "• Reuse tiles of duplicate images – Images with identical content and settings are split "
+    "once; the other copies get hardlinks to those tiles.\n"
+    "\n"
+    "👁️ Preview & Per-Image Settings\n"
+    "Selecting an image shows a preview and allows you to override the global defaults with "
+    "per-image choices for size, grid, output folder, and format. Use Apply to Image to save "
+    "the overrides, or Reset to Defaults to fall back to the global configuration.\n"
+    "Previews are rendered in the background and cached, so moving through the list stays "
+    "responsive. File → Cache Previews on Disk keeps thumbnails between sessions.\n"
+    "\n"
+    "🚀 Processing Images\n"
+    "After reviewing your list and settings, click Process All Images to generate the output.\n"
+    "Splitter will process each file according to its custom or global settings.\n"
+    "If an image fails, the rest of the batch continues and the failures are listed at the end.\n"
+    "The progress bar advances tile by tile. Cancel stops the current image between tiles "
+    "(or part-way through decoding it) rather than at the end of the image.\n"
+    "View → Processing Stats shows how long each stage (decode, resize, save, …) took in the last run.\n"
+    "\n"
+    "📌 Summary of Key Features\n"
+    "• Drag-and-drop or browse image loading\n"
+    "• Grid-based splitting\n"
+    "• Base size control for resizing and scaling\n"
+    "• Per-image customization\n"
+    "• Automatic output folder creation\n"
+    "• Maintain source format option\n"
+)
+
+
+def _setting(name):
+    """Property that reads and writes one column of the item's settings row."""
+    def get(self):
+        return self.table.get(self.row, name)
+
+    def set(self, value):
+        self.table.set(self.row, name, value)
+        self._summary = None
+    return property(get, set)
+
+
+class ImageItem:
+    """Represents an image with its individual processing settings.
+
+    The settings live in a row of the registry's SettingsTable; None means
+    the global default applies. Items are slotted so a large batch costs
+    little more than the path string per image.
+    """
+    __slots__ = ("path", "iid", "status", "table", "row", "_summary")
+
+    base_size = _setting("base_size")
+    custom_size = _setting("custom_size")
+    images_across = _setting("images_across")
+    images_high = _setting("images_high")
+    maintain_format = _setting("maintain_format")
+    custom_folder = _setting("custom_folder")
+    encoder = _setting("encoder")
+    quality = _setting("quality")
+
+    def __init__(self, file_path, table, row):
+        self.path = os.fspath(file_path)
+        self.iid = None  # Treeview row id, assigned by ImageRegistry
+        self.status = "pending"  # "pending", "done", "failed" or "skipped"
+        self.table = table
+        self.row = row
+        self._summary = None
+
+    @property
+    def file_path(self):
+        return Path(self.path)
+
+    @property
+    def name(self):
+        return os.path.basename(self.path)
+
+    def get_display_name(self):
+        """Get display name for the list."""
+        name = self.name
+        if self.has_custom_settings():
+            name = f"⚙ {name}"
+        return name
+        
+    def has_custom_settings(self):
+        """Check if this image has custom settings."""
+        return self.table.has_overrides(self.row)
+
+    def reset_settings(self):
+        self.table.reset(self.row)
+        self._summary = None
+        
+    def get_settings_summary(self):
+        """Get a summary of custom settings (cached until a setting changes)."""
+        if self._summary is None:
+            self._summary = self._build_summary()
+        return self._summary
+
+    def _build_summary(self):
+        if not self.has_custom_settings():
+            return "Using global defaults"
+        
+        parts = []
+        if self.custom_size:
+            parts.append(f"Size: {self.custom_size}")
+        elif self.base_size:
+            parts.append(f"Size: {self.base_size}")
+            
+        if self.images_across or self.images_high:
+            across = self.images_across or 1
+            high = self.images_high or 1
+            parts.append(f"Grid: {across}×{high}")
+            
+        if self.maintain_format is not None:
+            parts.append("Keep format" if self.maintain_format else "Convert to JPEG")
+            
+        if self.custom_folder and self.custom_folder.strip():
+            parts.append(f"Folder: {self.custom_folder}")
+
+        if self.encoder:
+            parts.append(f"Encoder: {self.encoder}")
+        if self.quality:
+            parts.append(f"Quality: {self.quality}")
+            
+        return " | ".join(parts) if parts else "Using global defaults"
+
+
+class ImageRegistry:
+    """The loaded images in list order, indexed by Treeview iid and by path.
+
+    Lookup, duplicate detection and removal are all O(1). Paths are
+    compared after resolving symlinks and normalising case where the
+    platform ignores it, so the same file added twice is only listed once.
+    """
+    def __init__(self):
+        self._items = {}    # iid -> ImageItem, in insertion order
+        self._by_path = {}  # path key -> iid
+        self._keys = {}     # iid -> path key
+        self._next_id = 0
+        self.settings = SettingsTable()
+
+    @staticmethod
+    def path_key(file_path):
+        return os.path.normcase(os.path.realpath(file_path))
+
+    def add(self, file_path):
+        """Add an image and return its ImageItem, or None if it is already listed."""
+        key = self.path_key(file_path)
+        if key in self._by_path:
+            return None
+        img_item = ImageItem(file_path, self.settings, self.settings.add_row())
+        self._next_id += 1
+        img_item.iid = f"img{self._next_id}"
+        self._items[img_item.iid] = img_item
+        self._by_path[key] = img_item.iid
+        self._keys[img_item.iid] = key
+        return img_item
+
+    def get(self, iid):
+        return self._items.get(iid)
+
+    def find(self, file_path):
+        """Return the ImageItem listed for file_path, or None."""
+        iid = self._by_path.get(self.path_key(file_path))
+        return self._items.get(iid) if iid else None
+
+    def remove(self, iid):
+        img_item = self._items.pop(iid, None)
+        if img_item is not None:
+            del self._by_path[self._keys.pop(iid)]
+            self.settings.free_row(img_item.row)
+        return img_item
+
+    def clear(self):
+        self._items.clear()
+        self._by_path.clear()
+        self._keys.clear()
+        self.settings.clear()
+
+    def __len__(self):
+        return len(self._items)
+
+    def __iter__(self):
+        return iter(list(self._items.values()))
+
+    def __contains__(self, iid):
+        return iid in self._items
+
+
+class ImageSplitterConfig:
+    """Configuration and state management for image splitting operations."""
+    def __init__(self):
+        self.image_items = ImageRegistry()
+        self.selected_item = None
+        self.processing = False
+
+
+class VirtualImageList:
+    """Image list that only creates Treeview rows for what is on screen.
+
+    ``view`` holds the ids of the registry items that pass the current
+    filter, in list order. The Treeview shows a window of it starting at
+    ``top``; scrolling moves that window and re-renders the rows, so Tk
+    memory and redraw cost depend on the widget's height rather than on
+    how many images are loaded. Selection is tracked by item id here, so
+    it survives scrolling; filtering drops selected items that are hidden.
+    """
+    STATUS_ICONS = {"done": "✓", "failed": "✗", "skipped": "↷"}
+
+    def __init__(self, parent, registry, on_select):
+        self.registry = registry
+        self.on_select = on_select
+        self.view = []
+        self.view_index = {}
+        self.top = 0
+        self.visible_rows = 10
+        self.selected = []
+        self.shown_selection = ()
+        self.name_filter = ""
+        self.kind_filter = "all"
+
+        self.frame = ttk.Frame(parent)
+        self.frame.grid_rowconfigure(0, weight=1)
+        self.frame.grid_columnconfigure(0, weight=1)
+        self.scrollbar = ttk.Scrollbar(self.frame, command=self.yview)
+        self.scrollbar.grid(row=0, column=1, sticky='ns')
+        self.tree = ttk.Treeview(self.frame, columns=('settings', 'status'), show='tree', height=10)
+        self.tree.grid(row=0, column=0, sticky='nsew')
+        self.tree.column('#0', width=300)
+        self.tree.column('settings', width=200)
+        self.tree.column('status', width=30, anchor='center', stretch=False)
+
+        self.tree.bind('<<TreeviewSelect>>', self.on_tree_select)
+        self.tree.bind('<Configure>', self.on_configure)
+        for sequence in ('<MouseWheel>', '<Button-4>', '<Button-5>'):
+            self.tree.bind(sequence, self.on_wheel)
+        keys = {'<Up>': -1, '<Down>': 1, '<Prior>': "-page", '<Next>': "page",
+                '<Home>': "home", '<End>': "end"}
+        for sequence, step in keys.items():
+            self.tree.bind(sequence, lambda event, step=step: self.move_selection(step))
+
+    def grid(self, **kwargs):
+        self.frame.grid(**kwargs)
+
+    def matches(self, img_item):
+        """Return True if img_item passes the name and kind filters."""
+        kind = self.kind_filter
+        if kind == "custom" and not img_item.has_custom_settings():
+            return False
+        if kind not in ("all", "custom") and img_item.status != kind:
+            return False
+        return not self.name_filter or self.name_filter in img_item.name.lower()
+
+    def set_filter(self, name=None, kind=None):
+        if name is not None:
+            self.name_filter = name.strip().lower()
+        if kind is not None:
+            self.kind_filter = kind
+        self.refresh()
+
+    def refresh(self):
+        """Rebuild the filtered view from the registry and re-render it."""
+        self.view = [img_item.iid for img_item in self.registry if self.matches(img_item)]
+        self.view_index = {iid: index for index, iid in enumerate(self.view)}
+        selected = [iid for iid in self.selected if iid in self.view_index]
+        changed = selected != self.selected
+        self.selected = selected
+        self.render()
+        if changed:
+            self.on_select()
+
+    def append(self, img_items):
+        """Add newly registered items to the end of the view."""
+        for img_item in img_items:
+            if self.matches(img_item):
+                self.view_index[img_item.iid] = len(self.view)
+                self.view.append(img_item.iid)
+        self.render()
+
+    def row_values(self, img_item):
+        return (img_item.get_settings_summary(), self.STATUS_ICONS.get(img_item.status, ""))
+
+    def render(self):
+        """Show the rows of the view that fit in the widget, starting at top."""
+        total = len(self.view)
+        self.top = max(0, min(self.top, total - self.visible_rows))
+        window = self.view[self.top:self.top + self.visible_rows]
+        if tuple(self.tree.get_children()) != tuple(window):
+            self.tree.delete(*self.tree.get_children())
+            for iid in window:
+                img_item = self.registry.get(iid)
+                self.tree.insert('', 'end', iid=iid, text=img_item.get_display_name(),
+                                 values=self.row_values(img_item))
+        else:
+            for iid in window:
+                img_item = self.registry.get(iid)
+                self.tree.item(iid, text=img_item.get_display_name(), values=self.row_values(img_item))
+
+        selected = set(self.selected)
+        shown = tuple(iid for iid in window if iid in selected)
+        if shown != self.tree.selection():
+            self.tree.selection_set(shown)
+        # Remember what was set here, so on_tree_select can ignore the echo.
+        self.shown_selection = shown
+        if total:
+            self.scrollbar.set(self.top / total, (self.top + len(window)) / total)
+        else:
+            self.scrollbar.set(0, 1)
+
+    def refresh_item(self, img_item):
+        """Redraw one item's row if it is on screen."""
+        if self.tree.exists(img_item.iid):
+            self.tree.item(img_item.iid, text=img_item.get_display_name(), values=self.row_values(img_item))
+
+    def on_tree_select(self, event=None):
+        current = self.tree.selection()
+        if current == self.shown_selection:
+            return
+        self.shown_selection = current
+        self.selected = list(current)
+        self.on_select()
+
+    def selection(self):
+        """Return the ids of the selected items."""
+        return list(self.selected)
+
+    def select(self, iids):
+        self.selected = [iid for iid in iids if iid in self.view_index]
+        if self.selected:
+            self.see(self.selected[-1])
+        self.render()
+        self.on_select()
+
+    def see(self, iid):
+        """Scroll so the item is on screen."""
+        index = self.view_index.get(iid)
+        if index is None:
+            return
+        if index < self.top:
+            self.top = index
+        elif index >= self.top + self.visible_rows:
+            self.top = index - self.visible_rows + 1
+        self.render()
+
+    def move_selection(self, step):
+        """Move the selection by a row, a page, or to either end of the view."""
+        if not self.view:
+            return "break"
+        if step in ("home", "end"):
+            index = 0 if step == "home" else len(self.view) - 1
+        else:
+            if step in ("page", "-page"):
+                step = self.visible_rows if step == "page" else -self.visible_rows
+            current = self.view_index.get(self.selected[-1]) if self.selected else None
+            if current is None:
+                current = self.top - 1 if step > 0 else self.top + self.visible_rows
+            index = max(0, min(len(self.view) - 1, current + step))
+        self.select([self.view[index]])
+        return "break"
+
+    def neighbours(self, iid, count):
+        """Return up to count item ids after and before iid, nearest first."""
+        index = self.view_index.get(iid)
+        if index is None:
+            return []
+        neighbour_ids = []
+        for offset in range(1, count + 1):
+            for position in (index + offset, index - offset):
+                if 0 <= position < len(self.view):
+                    neighbour_ids.append(self.view[position])
+        return neighbour_ids
+
+    def yview(self, *args):
+        """Scrollbar command: scroll the window over the view."""
+        if args[0] == 'moveto':
+            self.top = int(float(args[1]) * len(self.view))
+        elif args[0] == 'scroll':
+            amount = int(args[1])
+            self.top += amount * (self.visible_rows if args[2] == 'pages' else 1)
+        self.render()
+
+    def on_wheel(self, event):
+        if event.num == 4 or event.delta > 0:
+            self.top -= LIST_WHEEL_ROWS
+        else:
+            self.top += LIST_WHEEL_ROWS
+        self.render()
+        return "break"
+
+    def on_configure(self, event):
+        style = ttk.Style(self.tree)
+        row_height = int(style.lookup(self.tree.cget('style') or 'Treeview', 'rowheight') or 20)
+        # Only whole rows, so the Treeview never scrolls itself to reveal one.
+        rows = max(1, (event.height - 4) // row_height)
+        if rows != self.visible_rows:
+            self.visible_rows = rows
+            self.render()
+
+
+class PreviewEntry:
+    """A rendered preview thumbnail plus the source details shown beside it."""
+    def __init__(self, thumbnail, width, height, file_size):
+        self.thumbnail = thumbnail
+        self.width = width
+        self.height = height
+        self.file_size = file_size
+
+    @property
+    def nbytes(self):
+        return self.thumbnail.width * self.thumbnail.height * len(self.thumbnail.getbands())
+
+
+class PreviewCache:
+    """Thread-safe LRU cache of preview thumbnails with a byte budget.
+
+    Entries are keyed by resolved path, mtime and file size, so editing a
+    file on disk renders a fresh preview. When ``disk_dir`` is set, rendered
+    thumbnails are also stored there as PNG files and reused after a restart.
+    """
+    def __init__(self, preview_size, max_bytes=PREVIEW_CACHE_BYTES, disk_dir=None,
+                 disk_max_bytes=PREVIEW_DISK_CACHE_BYTES):
+        self.preview_size = preview_size
+        self.max_bytes = max_bytes
+        self.disk_dir = disk_dir
+        self.disk_max_bytes = disk_max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def make_key(self, path):
+        """Return the cache key for a file as it currently exists on disk."""
+        path = Path(path)
+        stat = path.stat()
+        return (str(path.resolve()), stat.st_mtime_ns, stat.st_size)
+
+    def get(self, path):
+        """Return the in-memory entry for path, or None without rendering."""
+        try:
+            key = self.make_key(path)
+        except OSError:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def load(self, path):
+        """Return the entry for path from memory, disk, or by rendering it."""
+        key = self.make_key(path)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                return entry
+
+        entry = self._read_disk(key)
+        if entry is None:
+            entry = self._render(path, key)
+            self._write_disk(key, entry)
+        self._put(key, entry)
+        return entry
+
+    def _put(self, key, entry):
+        with self._lock:
+            if key in self._entries:
+                return
+            self._entries[key] = entry
+            self._bytes += entry.nbytes
+            while self._bytes > self.max_bytes and len(self._entries) > 1:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= evicted.nbytes
+
+    def _render(self, path, key):
+        with Image.open(path) as img:
+            width, height = img.size
+            preview = plan_decode(img, self.preview_size, self.preview_size)
+            preview.thumbnail((self.preview_size, self.preview_size), Image.Resampling.LANCZOS)
+            thumbnail = preview.copy()
+        if thumbnail.mode not in ("L", "RGB", "RGBA"):
+            has_alpha = "A" in thumbnail.getbands() or "transparency" in thumbnail.info
+            thumbnail = thumbnail.convert("RGBA" if has_alpha else "RGB")
+        return PreviewEntry(thumbnail, width, height, key[2])
+
+    def _disk_path(self, key):
+        digest = hashlib.sha1(repr((key, self.preview_size)).encode("utf-8")).hexdigest()
+        return Path(self.disk_dir) / f"{digest}.png"
+
+    def _read_disk(self, key):
+        if not self.disk_dir:
+            return None
+        disk_path = self._disk_path(key)
+        try:
+            with Image.open(disk_path) as img:
+                img.load()
+                width = int(img.text["width"])
+                height = int(img.text["height"])
+                thumbnail = img.copy()
+            os.utime(disk_path)
+        except Exception:
+            return None
+        return PreviewEntry(thumbnail, width, height, key[2])
+
+    def _write_disk(self, key, entry):
+        if not self.disk_dir:
+            return
+        disk_path = self._disk_path(key)
+        info = PngImagePlugin.PngInfo()
+        info.add_text("width", str(entry.width))
+        info.add_text("height", str(entry.height))
+        try:
+            disk_path.parent.mkdir(parents=True, exist_ok=True)
+            temp_path = disk_path.with_suffix(f".{os.getpid()}.tmp")
+            entry.thumbnail.save(temp_path, "PNG", pnginfo=info, compress_level=1)
+            os.replace(temp_path, disk_path)
+        except OSError as exc:
+            print(f"Warning: Failed to write preview cache: {exc}")
+
+    def prune_disk(self):
+        """Delete the least recently used disk thumbnails beyond the disk budget."""
+        if not self.disk_dir or not Path(self.disk_dir).is_dir():
+            return
+        files = []
+        for path in Path(self.disk_dir).glob("*.png"):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, path))
+        total = sum(size for _, size, _ in files)
+        for _, size, path in sorted(files):
+            if total <= self.disk_max_bytes:
+                break
+            try:
+                path.unlink()
+                total -= size
+            except OSError:
+                pass
+
+
+class PreviewLoader:
+    """Renders preview thumbnails on a background thread.
+
+    Each request replaces any queued work: the selected image is rendered
+    first, followed by its neighbours as prefetch. ``on_ready(path, entry,
+    error)`` is called on the worker thread for every finished item.
+    """
+    def __init__(self, cache, on_ready):
+        self.cache = cache
+        self.on_ready = on_ready
+        self._pending = deque()
+        self._condition = threading.Condition()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def request(self, path, prefetch=()):
+        """Queue path (if any) followed by the prefetch paths."""
+        with self._condition:
+            self._pending.clear()
+            if path is not None:
+                self._pending.append(Path(path))
+            self._pending.extend(Path(item) for item in prefetch)
+            self._condition.notify()
+
+    def _run(self):
+        self.cache.prune_disk()
+        while True:
+            with self._condition:
+                while not self._pending:
+                    self._condition.wait()
+                path = self._pending.popleft()
+            try:
+                entry = self.cache.load(path)
+            except Exception as e:
+                self.on_ready(path, None, str(e))
+            else:
+                self.on_ready(path, entry, None)
+
+
+class ImageSplitterGUI:
+    """Modern GUI for image splitting application."""
+    
+    VALID_EXTENSIONS = VALID_EXTENSIONS
+    
+    PREVIEW_SIZE = 300
+    
+    def __init__(self, root):
+        self.root = root
+        self.root.title("Image Splitter and Resizer - Per-Image Settings")
+        self.root.minsize(900, 600)
+        
+        # Apply modern theme
+        if THEME_AVAILABLE:
+            sv_ttk.set_theme("dark")
+        
+        self.config = ImageSplitterConfig()
+        self.last_stats = None
+        self.cancel_token = None
+        self.pending_status = {}
+        self.status_update_scheduled = False
+        self.status_lock = threading.Lock()
+        self.preview_image = None
+        self.preview_cache = PreviewCache(self.PREVIEW_SIZE)
+        self.preview_loader = PreviewLoader(self.preview_cache, self.on_preview_ready)
+        self.tooltips = {}
+        self.load_tooltips()
+        self.disk_preview_cache_var = BooleanVar(value=False)
+        self.create_menubar()
+        self.setup_variables()
+        self.setup_ui()
+        self.validate_inputs()
+
+    def load_tooltips(self):
+        """Load tooltip overrides from JSON configuration file."""
+        if TOOLTIP_CONFIG_FILE.exists():
+            try:
+                with TOOLTIP_CONFIG_FILE.open("r", encoding="utf-8") as handle:
+                    data = json.load(handle)
+                if isinstance(data, dict):
+                    self.tooltips = {str(key): str(value) for key, value in data.items()}
+                else:
+                    print("Warning: tooltips.json must contain a JSON object of key/value pairs.")
+                    self.tooltips = {}
+            except Exception as exc:
+                print(f"Warning: Failed to load tooltip configuration: {exc}")
+                self.tooltips = {}
+        else:
+            self.tooltips = {}
+        
+    def create_menubar(self):
+        """Create application menu bar."""
+        menubar = Menu(self.root)
+
+        file_menu = Menu(menubar, tearoff=False)
+        file_menu.add_command(label="Export Job File…", command=self.export_job_file)
+        file_menu.add_command(label="Reset", command=self.reset_application)
+        file_menu.add_checkbutton(label="Cache Previews on Disk", variable=self.disk_preview_cache_var,
+                                  command=self.toggle_disk_preview_cache)
+        file_menu.add_separator()
+        file_menu.add_command(label="Exit", command=self.root.quit)
+        menubar.add_cascade(label="File", menu=file_menu)
+
+        view_menu = Menu(menubar, tearoff=False)
+        view_menu.add_command(label="Processing Stats", command=self.show_processing_stats)
+        menubar.add_cascade(label="View", menu=view_menu)
+
+        help_menu = Menu(menubar, tearoff=False)
+        help_menu.add_command(label="User Guide", command=self.show_help_manual)
+        menubar.add_cascade(label="Help", menu=help_menu)
+
+        self.root.config(menu=menubar)
+
+    def export_job_file(self):
+        """Save the list, global defaults and per-image overrides as a job file."""
+        if not self.config.image_items:
+            messagebox.showwarning("Warning", "No images to export.")
+            return
+        path = filedialog.asksaveasfilename(
+            defaultextension=".jsonl",
+            filetypes=[("Job files", "*.jsonl"), ("All files", "*.*")]
+        )
+        if not path:
+            return
+
+        settings = self.config.image_items.settings
+        images = ((os.path.abspath(img_item.path), settings.overrides(img_item.row))
+                  for img_item in self.config.image_items)
+        try:
+            count = write_job_file(path, self.get_global_settings(), images)
+        except OSError as exc:
+            messagebox.showerror("Export failed", f"Could not write {path}:\n{exc}")
+            return
+        self.status_var.set(f"✓ Exported {count} image(s) to {Path(path).name}")
+
+    def toggle_disk_preview_cache(self):
+        """Enable or disable the on-disk preview thumbnail cache."""
+        enabled = self.disk_preview_cache_var.get()
+        self.preview_cache.disk_dir = PREVIEW_DISK_CACHE_DIR if enabled else None
+
+    def reset_application(self):
+        """Reset all settings and clear the workspace."""
+        if not messagebox.askyesno(
+            "Reset Application",
+            "Clear all images and restore the default settings?"
+        ):
+            return
+
+        # Reset global defaults
+        self.global_size_var.set("512")
+        self.global_custom_size_var.set("")
+        self.global_images_across_var.set(1)
+        self.global_images_high_var.set(1)
+        self.global_maintain_format_var.set(False)
+        self.global_folder_name_var.set("")
+        self.global_encoder_var.set(DEFAULT_ENCODER)
+        self.workers_var.set(os.cpu_count() or 1)
+        self.incremental_var.set(False)
+        self.dedupe_var.set(False)
+
+        # Reset per-image defaults
+        self.size_var.set("512")
+        self.custom_size_var.set("")
+        self.images_across_var.set(1)
+        self.images_high_var.set(1)
+        self.maintain_format_var.set(False)
+        self.folder_name_var.set("")
+        self.encoder_var.set(DEFAULT_ENCODER)
+        self.use_custom_settings_var.set(False)
+        self.toggle_settings_state(False)
+
+        # Clear images and preview
+        self.clear_list()
+        self.status_var.set("Restored default settings.")
+        self.validate_inputs()
+
+    def show_processing_stats(self):
+        """Display the per-stage timing breakdown of the last processing run."""
+        stats_window = Toplevel(self.root)
+        stats_window.title("Processing Stats")
+        stats_window.geometry("960x320")
+        stats_window.transient(self.root)
+
+        text_area = scrolledtext.ScrolledText(stats_window, wrap='none', font=('Courier', 10))
+        text_area.pack(fill='both', expand=True)
+        text_area.insert('1.0', self.last_stats or "No images have been processed yet.")
+        text_area.configure(state='disabled')
+        text_area.focus_set()
+
+        stats_window.bind('<Escape>', lambda event: stats_window.destroy())
+
+    def show_help_manual(self):
+        """Display the help guide in a separate window."""
+        help_window = Toplevel(self.root)
+        help_window.title("Splitter – User Help Guide")
+        help_window.geometry("720x640")
+        help_window.transient(self.root)
+        help_window.grab_set()
+
+        text_area = scrolledtext.ScrolledText(help_window, wrap='word')
+        text_area.pack(fill='both', expand=True)
+        text_area.insert('1.0', HELP_TEXT)
+        text_area.configure(state='disabled')
+        text_area.focus_set()
+
+        def close_on_escape(event=None):
+            help_window.destroy()
+
+        help_window.bind('<Escape>', close_on_escape)
+
+    def setup_variables(self):
+        """Initialize tkinter variables."""
+        # Global defaults
+        self.global_size_var = StringVar(value="512")
+        self.global_custom_size_var = StringVar()
+        self.global_folder_name_var = StringVar()
+        self.global_images_across_var = IntVar(value=1)
+        self.global_images_high_var = IntVar(value=1)
+        self.global_maintain_format_var = BooleanVar()
+        self.global_encoder_var = StringVar(value=DEFAULT_ENCODER)
+        self.workers_var = IntVar(value=os.cpu_count() or 1)
+        self.incremental_var = BooleanVar(value=False)
+        self.dedupe_var = BooleanVar(value=False)
+        
+        # Per-image settings
+        self.size_var = StringVar(value="512")
+        self.custom_size_var = StringVar()
+        self.folder_name_var = StringVar()
+        self.images_across_var = IntVar(value=1)
+        self.images_high_var = IntVar(value=1)
+        self.maintain_format_var = BooleanVar()
+        self.encoder_var = StringVar(value=DEFAULT_ENCODER)
+        self.use_custom_settings_var = BooleanVar(value=False)
+        
+        self.status_var = StringVar(value="Ready")
+
+        # Image list filter
+        self.list_filter_var = StringVar()
+        self.list_filter_kind_var = StringVar(value=next(iter(LIST_FILTERS)))
+        self.list_filter_after_id = None
+        self.list_filter_var.trace('w', lambda *args: self.schedule_list_filter())
+        self.list_filter_kind_var.trace('w', lambda *args: self.apply_list_filter())
+        
+        # Add validation traces
+        self.custom_size_var.trace('w', lambda *args: self.validate_inputs())
+        self.images_across_var.trace('w', lambda *args: self.validate_inputs())
+        self.images_high_var.trace('w', lambda *args: self.validate_inputs())
+        self.use_custom_settings_var.trace('w', lambda *args: self.on_custom_settings_toggle())
+        
+    def setup_ui(self):
+        """Create the user interface."""
+        # Main container with padding
+        main_frame = ttk.Frame(self.root, padding="10")
+        main_frame.grid(row=0, column=0, sticky='nsew')
+        self.root.grid_rowconfigure(0, weight=1)
+        self.root.grid_columnconfigure(0, weight=1)
+        
+        # Create paned window for resizable sections
+        paned = ttk.PanedWindow(main_frame, orient='horizontal')
+        paned.grid(row=0, column=0, sticky='nsew')
+        main_frame.grid_rowconfigure(0, weight=1)
+        main_frame.grid_columnconfigure(0, weight=1)
+        
+        # Left panel - File list and global settings
+        left_panel = ttk.Frame(paned)
+        paned.add(left_panel, weight=1)
+        
+        # Right panel - Preview and per-image settings
+        right_panel = ttk.Frame(paned)
+        paned.add(right_panel, weight=1)
+        
+        # Setup left panel
+        self.create_file_section(left_panel)
+        self.create_global_settings_section(left_panel)
+        
+        # Setup right panel
+        self.create_preview_section(right_panel)
+        self.create_per_image_settings_section(right_panel)
+        
+        # Action buttons and status at bottom
+        self.create_action_buttons(main_frame)
+        self.create_status_section(main_frame)
+        
+    def create_file_section(self, parent):
+        """Create file selection UI."""
+        file_frame = ttk.LabelFrame(parent, text="Image Files", padding="10")
+        file_frame.grid(row=0, column=0, sticky='nsew', pady=(0, 10))
+        file_frame.grid_rowconfigure(2, weight=1)
+        file_frame.grid_columnconfigure(0, weight=1)
+        
+        # Browse button
+        btn_frame = ttk.Frame(file_frame)
+        btn_frame.grid(row=0, column=0, sticky='ew', pady=(0, 5))
+        
+        self.browse_btn = ttk.Button(btn_frame, text="📁 Browse Images", command=self.browse_images)
+        self.browse_btn.pack(side='left', padx=(0, 5))
+        self.create_tooltip(self.browse_btn, "browse_button", "Select one or more image files to process")
+        
+        ttk.Label(btn_frame, text="or drag and drop files below", foreground="gray").pack(side='left')
+        
+        # Filter bar
+        filter_frame = ttk.Frame(file_frame)
+        filter_frame.grid(row=1, column=0, sticky='ew', pady=(0, 5))
+        filter_frame.grid_columnconfigure(1, weight=1)
+        ttk.Label(filter_frame, text="Filter:").grid(row=0, column=0, sticky='w', padx=(0, 5))
+        filter_entry = ttk.Entry(filter_frame, textvariable=self.list_filter_var)
+        filter_entry.grid(row=0, column=1, sticky='ew', padx=(0, 5))
+        self.create_tooltip(filter_entry, "image_filter", "Show only images whose name contains this text")
+        filter_kind = ttk.Combobox(filter_frame, textvariable=self.list_filter_kind_var,
+                                   values=list(LIST_FILTERS), state='readonly', width=15)
+        filter_kind.grid(row=0, column=2, sticky='e')
+        self.create_tooltip(filter_kind, "image_filter_kind", "Show all images, only customised ones, or only those with a given processing status")
+
+        # Virtualized list; only the rows on screen exist as Treeview items
+        self.image_list = VirtualImageList(file_frame, self.config.image_items, self.on_image_select)
+        self.image_list.grid(row=2, column=0, sticky='nsew')
+        self.create_tooltip(self.image_list.tree, "image_list", "Select an image to preview and adjust settings")
+        
+        # Enable drag and drop
+        self.image_list.tree.drop_target_register(DND_FILES)
+        self.image_list.tree.dnd_bind('<<Drop>>', self.on_drop)
+        
+        # Buttons
+        btn_frame2 = ttk.Frame(file_frame)
+        btn_frame2.grid(row=3, column=0, sticky='ew', pady=(5, 0))
+        
+        self.clear_btn = ttk.Button(btn_frame2, text="Clear List", command=self.clear_list)
+        self.clear_btn.pack(side='left', padx=(0, 5))
+        self.create_tooltip(self.clear_btn, "clear_list_button", "Remove all images from the list")
+        
+        self.remove_btn = ttk.Button(btn_frame2, text="Remove Selected", command=self.remove_selected)
+        self.remove_btn.pack(side='left')
+        self.create_tooltip(self.remove_btn, "remove_selected_button", "Remove the highlighted image from the list")
+        
+        parent.grid_rowconfigure(0, weight=1)
+        parent.grid_columnconfigure(0, weight=1)
+        
+    def create_global_settings_section(self, parent):
+        """Create global default settings UI."""
+        settings_frame = ttk.LabelFrame(parent, text="Global Default Settings", padding="10")
+        settings_frame.grid(row=1, column=0, sticky='ew', pady=(0, 10))
+        
+        # Size options
+        size_frame = ttk.Frame(settings_frame)
+        size_frame.grid(row=0, column=0, columnspan=2, sticky='ew', pady=(0, 5))
+        
+        ttk.Label(size_frame, text="Base Size:").pack(side='left', padx=(0, 5))
+        global_size_combo = ttk.Combobox(size_frame, textvariable=self.global_size_var, 
+                                         values=["512", "768", "1024", "2048", "4096"], 
+                                         width=10, state='readonly')
+        global_size_combo.pack(side='left', padx=(0, 10))
+        self.create_tooltip(global_size_combo, "global_base_size", "Default output size for all images")
+        
+        ttk.Label(size_frame, text="Custom:").pack(side='left', padx=(0, 5))
+        global_custom_entry = ttk.Entry(size_frame, textvariable=self.global_custom_size_var, width=10)
+        global_custom_entry.pack(side='left')
+        self.create_tooltip(global_custom_entry, "global_custom_size", "Override the base size with a custom pixel value")
+        
+        # Grid options
+        grid_frame = ttk.Frame(settings_frame)
+        grid_frame.grid(row=1, column=0, columnspan=2, sticky='ew', pady=(0, 5))
+        
+        ttk.Label(grid_frame, text="Across:").pack(side='left', padx=(0, 5))
+        global_across_spin = ttk.Spinbox(grid_frame, from_=1, to=10, textvariable=self.global_images_across_var, width=8)
+        global_across_spin.pack(side='left', padx=(0, 10))
+        self.create_tooltip(global_across_spin, "global_images_across", "Number of columns to split each image into")
+        
+        ttk.Label(grid_frame, text="High:").pack(side='left', padx=(0, 5))
+        global_high_spin = ttk.Spinbox(grid_frame, from_=1, to=10, textvariable=self.global_images_high_var, width=8)
+        global_high_spin.pack(side='left')
+        self.create_tooltip(global_high_spin, "global_images_high", "Number of rows to split each image into")
+        
+        # Other options
+        global_format_check = ttk.Checkbutton(settings_frame, text="Maintain source format", 
+                                             variable=self.global_maintain_format_var)
+        global_format_check.grid(row=2, column=0, columnspan=2, sticky='w')
+        self.create_tooltip(global_format_check, "global_maintain_format", "Keep original file format instead of converting to JPEG")
+        
+        ttk.Label(settings_frame, text="Encoder:").grid(row=3, column=0, sticky='w', pady=(5, 0))
+        global_encoder_combo = ttk.Combobox(settings_frame, textvariable=self.global_encoder_var,
+                                            values=list(ENCODER_PRESETS), width=10, state='readonly')
+        global_encoder_combo.grid(row=3, column=1, sticky='w', pady=(5, 0))
+        self.create_tooltip(global_encoder_combo, "global_encoder", "Trade encoding speed against file size: fast, balanced or smallest")
+
+        ttk.Label(settings_frame, text="Output Folder:").grid(row=4, column=0, sticky='w', pady=(5, 0))
+        global_folder_entry = ttk.Entry(settings_frame, textvariable=self.global_folder_name_var)
+        global_folder_entry.grid(row=4, column=1, sticky='ew', pady=(5, 0))
+        self.create_tooltip(global_folder_entry, "global_output_folder", "Optional subfolder name created inside each image's directory")
+
+        ttk.Label(settings_frame, text="Workers:").grid(row=5, column=0, sticky='w', pady=(5, 0))
+        workers_spin = ttk.Spinbox(settings_frame, from_=1, to=max(64, os.cpu_count() or 1),
+                                   textvariable=self.workers_var, width=8)
+        workers_spin.grid(row=5, column=1, sticky='w', pady=(5, 0))
+        self.create_tooltip(workers_spin, "global_workers", "Number of images processed in parallel (one per CPU core by default)")
+
+        incremental_check = ttk.Checkbutton(settings_frame, text="Skip unchanged images",
+                                            variable=self.incremental_var)
+        incremental_check.grid(row=6, column=0, columnspan=2, sticky='w', pady=(5, 0))
+        self.create_tooltip(incremental_check, "global_incremental", "Only split images that are new or changed since the last run with the same settings")
+
+        dedupe_check = ttk.Checkbutton(settings_frame, text="Reuse tiles of duplicate images",
+                                       variable=self.dedupe_var)
+        dedupe_check.grid(row=7, column=0, columnspan=2, sticky='w', pady=(5, 0))
+        self.create_tooltip(dedupe_check, "global_dedupe", "Split images with identical content and settings once and hardlink the tiles for the other copies")
+        settings_frame.grid_columnconfigure(1, weight=1)
+        
+    def create_preview_section(self, parent):
+        """Create image preview UI."""
+        preview_frame = ttk.LabelFrame(parent, text="Preview", padding="10")
+        preview_frame.grid(row=0, column=0, sticky='nsew', pady=(0, 10))
+        preview_frame.grid_rowconfigure(1, weight=1)
+        preview_frame.grid_columnconfigure(0, weight=1)
+        parent.grid_rowconfigure(0, weight=1)
+        parent.grid_columnconfigure(0, weight=1)
+        
+        # Info label
+        self.preview_info_label = ttk.Label(preview_frame, text="Select an image to preview")
+        self.preview_info_label.grid(row=0, column=0, sticky='ew', pady=(0, 5))
+        
+        # Preview canvas
+        preview_canvas_frame = ttk.Frame(preview_frame, relief='sunken', borderwidth=2)
+        preview_canvas_frame.grid(row=1, column=0, sticky='nsew')
+        preview_canvas_frame.grid_rowconfigure(0, weight=1)
+        preview_canvas_frame.grid_columnconfigure(0, weight=1)
+        
+        self.preview_label = ttk.Label(preview_canvas_frame, text="No image selected", 
+                                       anchor='center', background='#2b2b2b')
+        self.preview_label.grid(row=0, column=0, sticky='nsew')
+        
+    def create_per_image_settings_section(self, parent):
+        """Create per-image settings UI."""
+        settings_frame = ttk.LabelFrame(parent, text="Image-Specific Settings", padding="10")
+        settings_frame.grid(row=1, column=0, sticky='nsew')
+        settings_frame.grid_columnconfigure(0, weight=1)
+        
+        # Enable custom settings checkbox
+        self.use_custom_check = ttk.Checkbutton(settings_frame, 
+                                               text="Use custom settings for this image",
+                                               variable=self.use_custom_settings_var)
+        self.use_custom_check.grid(row=0, column=0, columnspan=2, sticky='w', pady=(0, 10))
+        self.create_tooltip(self.use_custom_check, "per_image_enable_custom", "Override global defaults for the selected image")
+        
+        # Settings container
+        self.settings_container = ttk.Frame(settings_frame)
+        self.settings_container.grid(row=1, column=0, columnspan=2, sticky='nsew')
+        self.settings_container.grid_columnconfigure(1, weight=1)
+        
+        # Size options
+        row = 0
+        ttk.Label(self.settings_container, text="Base Size:").grid(row=row, column=0, sticky='w', pady=2)
+        per_image_size_combo = ttk.Combobox(self.settings_container, textvariable=self.size_var, 
+                                            values=["512", "768", "1024", "2048", "4096"], 
+                                            width=15, state='readonly')
+        per_image_size_combo.grid(row=row, column=1, sticky='w', pady=2)
+        self.create_tooltip(per_image_size_combo, "per_image_base_size", "Base output size when no custom pixel size is provided")
+        
+        row += 1
+        ttk.Label(self.settings_container, text="Custom Size:").grid(row=row, column=0, sticky='w', pady=2)
+        self.custom_size_entry = ttk.Entry(self.settings_container, textvariable=self.custom_size_var, width=15)
+        self.custom_size_entry.grid(row=row, column=1, sticky='w', pady=2)
+        self.create_tooltip(self.custom_size_entry, "per_image_custom_size", "Exact pixel size for the selected image (overrides base size)")
+        
+        row += 1
+        ttk.Label(self.settings_container, text="Images Across:").grid(row=row, column=0, sticky='w', pady=2)
+        self.across_entry = ttk.Spinbox(self.settings_container, from_=1, to=10, 
+                                       textvariable=self.images_across_var, width=15)
+        self.across_entry.grid(row=row, column=1, sticky='w', pady=2)
+        self.create_tooltip(self.across_entry, "per_image_images_across", "Number of columns to slice for this image")
+        
+        row += 1
+        ttk.Label(self.settings_container, text="Images High:").grid(row=row, column=0, sticky='w', pady=2)
+        self.high_entry = ttk.Spinbox(self.settings_container, from_=1, to=10, 
+                                     textvariable=self.images_high_var, width=15)
+        self.high_entry.grid(row=row, column=1, sticky='w', pady=2)
+        self.create_tooltip(self.high_entry, "per_image_images_high", "Number of rows to slice for this image")
+        
+        row += 1
+        ttk.Label(self.settings_container, text="Output Folder:").grid(row=row, column=0, sticky='w', pady=2)
+        per_image_folder_entry = ttk.Entry(self.settings_container, textvariable=self.folder_name_var)
+        per_image_folder_entry.grid(row=row, column=1, sticky='ew', pady=2)
+        self.create_tooltip(per_image_folder_entry, "per_image_output_folder", "Optional subfolder name for this image's output")
+        
+        row += 1
+        per_image_format_check = ttk.Checkbutton(self.settings_container, text="Maintain source format", 
+                                                variable=self.maintain_format_var)
+        per_image_format_check.grid(row=row, column=0, columnspan=2, sticky='w', pady=5)
+        self.create_tooltip(per_image_format_check, "per_image_maintain_format", "Keep this image's original format instead of converting to JPEG")
+
+        row += 1
+        ttk.Label(self.settings_container, text="Encoder:").grid(row=row, column=0, sticky='w', pady=2)
+        per_image_encoder_combo = ttk.Combobox(self.settings_container, textvariable=self.encoder_var,
+                                               values=list(ENCODER_PRESETS), width=15, state='readonly')
+        per_image_encoder_combo.grid(row=row, column=1, sticky='w', pady=2)
+        self.create_tooltip(per_image_encoder_combo, "per_image_encoder", "Encoder preset for this image's tiles")
+        
+        # Apply/Reset buttons
+        row += 1
+        btn_frame = ttk.Frame(self.settings_container)
+        btn_frame.grid(row=row, column=0, columnspan=2, sticky='ew', pady=(10, 0))
+        
+        self.apply_btn = ttk.Button(btn_frame, text="Apply to Image", command=self.apply_settings)
+        self.apply_btn.pack(side='left', padx=(0, 5))
+        self.create_tooltip(self.apply_btn, "per_image_apply", "Save the current settings to the selected image")
+        
+        self.reset_btn = ttk.Button(btn_frame, text="Reset to Defaults", command=self.reset_to_defaults)
+        self.reset_btn.pack(side='left')
+        self.create_tooltip(self.reset_btn, "per_image_reset", "Remove custom settings and use global defaults")
+        
+        # Initially disable settings
+        self.toggle_settings_state(False)
+        
+    def create_action_buttons(self, parent):
+        """Create action buttons."""
+        button_frame = ttk.Frame(parent)
+        button_frame.grid(row=1, column=0, sticky='ew', pady=(10, 0))
+        button_frame.grid_columnconfigure(0, weight=1)
+        button_frame.grid_columnconfigure(1, weight=1)
+        
+        self.process_btn = ttk.Button(button_frame, text="▶ Process All Images", 
+                                      command=self.start_processing, style='Accent.TButton')
+        self.process_btn.grid(row=0, column=0, sticky='ew', padx=(0, 5))
+        self.create_tooltip(self.process_btn, "process_all_button", "Begin processing all images using their configured settings")
+        
+        self.cancel_btn = ttk.Button(button_frame, text="⏹ Cancel", 
+                                     command=self.cancel_processing, state='disabled')
+        self.cancel_btn.grid(row=0, column=1, sticky='ew')
+        self.create_tooltip(self.cancel_btn, "cancel_button", "Stop the current processing job")
+        
+    def create_status_section(self, parent):
+        """Create status and progress display."""
+        status_frame = ttk.Frame(parent)
+        status_frame.grid(row=2, column=0, sticky='ew', pady=(10, 0))
+        status_frame.grid_columnconfigure(0, weight=1)
+        
+        self.progress = ttk.Progressbar(status_frame, mode='determinate')
+        self.progress.grid(row=0, column=0, sticky='ew', pady=(0, 5))
+        
+        self.status_label = ttk.Label(status_frame, textvariable=self.status_var)
+        self.status_label.grid(row=1, column=0, sticky='w')
+
+    def create_tooltip(self, widget, key, default_text=""):
+        """Create tooltip for widget using JSON overrides when available."""
+        tooltip_text = self.tooltips.get(key, default_text)
+        if not tooltip_text:
+            return
+
+        def show_tooltip(event):
+            tooltip = ttk.Label(self.root, text=tooltip_text, relief='solid', borderwidth=1, 
+                               background='#ffffe0', foreground='#000000', padding=5)
+            tooltip.update_idletasks()
+
+            self.root.update_idletasks()
+            root_x = self.root.winfo_rootx()
+            root_y = self.root.winfo_rooty()
+            root_width = self.root.winfo_width()
+            root_height = self.root.winfo_height()
+            tip_width = tooltip.winfo_reqwidth()
+            tip_height = tooltip.winfo_reqheight()
+
+            desired_x = event.x_root - root_x + 10
+            desired_y = event.y_root - root_y + 10
+
+            max_x = max(0, root_width - tip_width - 10)
+            max_y = max(0, root_height - tip_height - 10)
+
+            clamped_x = min(max(desired_x, 0), max_x)
+            clamped_y = min(max(desired_y, 0), max_y)
+
+            tooltip.place(x=clamped_x, y=clamped_y)
+            widget.tooltip = tooltip
+
+        def on_enter(event):
+            def delayed_show():
+                show_tooltip(event)
+
+            if hasattr(widget, 'tooltip_after_id'):
+                self.root.after_cancel(widget.tooltip_after_id)
+            widget.tooltip_after_id = self.root.after(1000, delayed_show)
+
+        def on_leave(event):
+            if hasattr(widget, 'tooltip_after_id'):
+                self.root.after_cancel(widget.tooltip_after_id)
+                delattr(widget, 'tooltip_after_id')
+            if hasattr(widget, 'tooltip'):
+                widget.tooltip.destroy()
+                delattr(widget, 'tooltip')
+                
+        widget.bind('<Enter>', on_enter)
+        widget.bind('<Leave>', on_leave)
+        
+    def toggle_settings_state(self, enabled):
+        """Enable or disable per-image settings widgets."""
+        state = 'normal' if enabled else 'disabled'
+        for child in self.settings_container.winfo_children():
+            if isinstance(child, (ttk.Entry, ttk.Spinbox, ttk.Combobox, ttk.Checkbutton, ttk.Button)):
+                child.configure(state=state)
+                
+    def on_custom_settings_toggle(self):
+        """Handle custom settings checkbox toggle."""
+        enabled = self.use_custom_settings_var.get()
+        print(f"Custom settings toggle: {enabled}")
+        self.toggle_settings_state(enabled)
+    
+    def schedule_list_filter(self):
+        """Re-filter the image list once typing pauses."""
+        if self.list_filter_after_id is not None:
+            self.root.after_cancel(self.list_filter_after_id)
+        self.list_filter_after_id = self.root.after(LIST_FILTER_DELAY_MS, self.apply_list_filter)
+
+    def apply_list_filter(self):
+        self.list_filter_after_id = None
+        self.image_list.set_filter(self.list_filter_var.get(),
+                                   LIST_FILTERS.get(self.list_filter_kind_var.get(), "all"))
+
+    def on_image_select(self, event=None):
+        """Handle image selection in listbox."""
+        selection = self.image_list.selection()
+        if not selection:
+            self.config.selected_item = None
+            self.clear_preview()
+            return
+            
+        img_item = self.config.image_items.get(selection[0])
+        if img_item is not None:
+            self.config.selected_item = img_item
+            self.load_preview(img_item)
+            self.load_image_settings(img_item)
+                
+    def load_preview(self, img_item):
+        """Show the preview for an image, rendering it in the background if needed."""
+        entry = self.preview_cache.get(img_item.file_path)
+        if entry is not None:
+            self.show_preview(img_item.file_path, entry, None)
+        else:
+            self.preview_label.config(image='', text="Loading preview…")
+            self.preview_info_label.config(text=img_item.file_path.name)
+            self.preview_image = None
+
+        prefetch = [item.file_path for item in self.get_neighbour_items(img_item)]
+        self.preview_loader.request(None if entry else img_item.file_path, prefetch)
+
+    def get_neighbour_items(self, img_item):
+        """Return the images listed just before and after img_item."""
+        neighbour_ids = self.image_list.neighbours(img_item.iid, PREVIEW_PREFETCH)
+        neighbours = (self.config.image_items.get(iid) for iid in neighbour_ids)
+        return [item for item in neighbours if item is not None]
+
+    def on_preview_ready(self, path, entry, error):
+        """Receive a rendered preview from the loader thread (thread-safe)."""
+        self.root.after(0, lambda: self.show_preview(path, entry, error))
+
+    def show_preview(self, path, entry, error):
+        """Display a rendered preview if its image is still selected."""
+        selected = self.config.selected_item
+        if selected is None or selected.file_path != path:
+            return
+        if error:
+            self.preview_label.config(image='', text=f"Error loading preview:\n{error}")
+            self.preview_info_label.config(text="Error loading image")
+            self.preview_image = None
+            return
+
+        info_text = f"{path.name} | {entry.width}×{entry.height} | {entry.file_size / 1024:.1f} KB"
+        self.preview_info_label.config(text=info_text)
+        photo = ImageTk.PhotoImage(entry.thumbnail)
+        self.preview_image = photo
+        self.preview_label.config(image=photo, text="")
+            
+    def clear_preview(self):
+        """Clear the preview display."""
+        self.preview_label.config(image='', text="No image selected")
+        self.preview_info_label.config(text="Select an image to preview")
+        self.preview_image = None
+        self.use_custom_settings_var.set(False)
+        self.toggle_settings_state(False)
+        
+    def load_image_settings(self, img_item):
+        """Load settings for selected image."""
+        if img_item.has_custom_settings():
+            self.use_custom_settings_var.set(True)
+            self.size_var.set(str(img_item.base_size or self.global_size_var.get()))
+            self.custom_size_var.set(str(img_item.custom_size or ""))
+            self.images_across_var.set(img_item.images_across or self.global_images_across_var.get())
+            self.images_high_var.set(img_item.images_high or self.global_images_high_var.get())
+            self.maintain_format_var.set(img_item.maintain_format if img_item.maintain_format is not None 
+                                        else self.global_maintain_format_var.get())
+            self.folder_name_var.set(img_item.custom_folder or self.global_folder_name_var.get())
+            self.encoder_var.set(img_item.encoder or self.global_encoder_var.get())
+        else:
+            self.use_custom_settings_var.set(False)
+            self.size_var.set(self.global_size_var.get())
+            self.custom_size_var.set(self.global_custom_size_var.get())
+            self.images_across_var.set(self.global_images_across_var.get())
+            self.images_high_var.set(self.global_images_high_var.get())
+            self.maintain_format_var.set(self.global_maintain_format_var.get())
+            self.folder_name_var.set(self.global_folder_name_var.get())
+            self.encoder_var.set(self.global_encoder_var.get())
+            
+    def apply_settings(self):
+        """Apply current settings to selected image."""
+        print(f"\n=== apply_settings called ===")
+        print(f"Selected item: {self.config.selected_item}")
+        print(f"use_custom_settings_var.get(): {self.use_custom_settings_var.get()}")
+        
+        if not self.config.selected_item:
+            print("No selected item, returning")
+            return
+            
+        if self.use_custom_settings_var.get():
+            print("✓ Custom settings enabled, applying...")
+            img_item = self.config.selected_item
+            # The table turns blank or out-of-range entries into inherited settings.
+            img_item.base_size = self.size_var.get()
+            img_item.custom_size = self.custom_size_var.get()
+            
+            # Read the spinboxes as text: IntVar.get() raises on a blank entry.
+            img_item.images_across = self.root.getvar(str(self.images_across_var))
+            img_item.images_high = self.root.getvar(str(self.images_high_var))
+            img_item.maintain_format = self.maintain_format_var.get()
+            
+            folder = self.folder_name_var.get().strip()
+            img_item.custom_folder = folder if folder else None
+            img_item.encoder = self.encoder_var.get()
+            
+            # Debug: Print what was saved
+            print(f"Applied settings to {img_item.file_path.name}:")
+            print(f"  base_size: {img_item.base_size}")
+            print(f"  custom_size: {img_item.custom_size}")
+            print(f"  images_across: {img_item.images_across}")
+            print(f"  images_high: {img_item.images_high}")
+            print(f"  maintain_format: {img_item.maintain_format}")
+            print(f"  custom_folder: {img_item.custom_folder}")
+            print(f"  has_custom_settings(): {img_item.has_custom_settings()}")
+            
+            self.update_listbox_item(img_item)
+            self.status_var.set(f"✓ Applied custom settings to {img_item.file_path.name}")
+        else:
+            print("✗ Custom settings NOT enabled, calling reset_to_defaults()")
+            self.reset_to_defaults()
+            
+    def reset_to_defaults(self):
+        """Reset selected image to use global defaults."""
+        if not self.config.selected_item:
+            return
+            
+        img_item = self.config.selected_item
+        img_item.reset_settings()
+        
+        self.use_custom_settings_var.set(False)
+        self.load_image_settings(img_item)
+        self.update_listbox_item(img_item)
+        self.status_var.set(f"✓ Reset {img_item.file_path.name} to global defaults")
+        
+    def update_listbox_item(self, img_item):
+        """Update listbox display for an image item."""
+        item_id = img_item.iid
+        print(f"Updating listbox for item_id: {item_id}")
+        print(f"  Display name: {img_item.get_display_name()}")
+        print(f"  Settings summary: {img_item.get_settings_summary()}")
+        if self.image_list.tree.exists(item_id):
+            self.image_list.refresh_item(img_item)
+            print(f"  ✓ Listbox updated")
+        
+    def validate_inputs(self):
+        """Validate user inputs and update UI state."""
+        valid = True
+        
+        # Validate custom size
+        custom_size = self.custom_size_var.get().strip()
+        if custom_size and not custom_size.isdigit():
+            valid = False
+            self.custom_size_entry.state(['invalid'])
+        else:
+            self.custom_size_entry.state(['!invalid'])
+            
+        # Validate grid dimensions
+        try:
+            across = self.images_across_var.get()
+            high = self.images_high_var.get()
+            if across <= 0 or high <= 0:
+                valid = False
+        except:
+            valid = False
+            
+        # Enable/disable process button
+        has_images = len(self.config.image_items) > 0
+        if valid and has_images and not self.config.processing:
+            self.process_btn.state(['!disabled'])
+        else:
+            self.process_btn.state(['disabled'])
+            
+        return valid
+        
+    def browse_images(self):
+        """Open file dialog to select images."""
+        file_paths = filedialog.askopenfilenames(
+            filetypes=[("Image files", "*.jpg *.jpeg *.png *.bmp *.webp")]
+        )
+        if file_paths:
+            self.add_images(file_paths)
+            
+    def on_drop(self, event):
+        """Handle drag and drop files."""
+        files = self.root.tk.splitlist(event.data)
+        self.add_images(file for file in files if Path(file).suffix.lower() in self.VALID_EXTENSIONS)
+
+    def add_images(self, file_paths):
+        """Register new images and add them to the end of the list."""
+        added = [img_item for img_item in map(self.config.image_items.add, file_paths) if img_item]
+        if not added:
+            return
+        self.image_list.append(added)
+        self.status_var.set(f"{len(self.config.image_items)} image(s) loaded")
+        self.validate_inputs()
+
+    def clear_list(self):
+        """Clear the file list."""
+        self.config.image_items.clear()
+        self.image_list.selected = []
+        self.image_list.refresh()
+        self.config.selected_item = None
+        self.clear_preview()
+        self.validate_inputs()
+        
+    def remove_selected(self):
+        """Remove the selected images from the list."""
+        selection = self.image_list.selection()
+        if not selection:
+            return
+            
+        for item_id in selection:
+            self.config.image_items.remove(item_id)
+        self.image_list.selected = []
+        self.image_list.refresh()
+        self.config.selected_item = None
+        self.clear_preview()
+        self.validate_inputs()
+        
+    def start_processing(self):
+        """Start image processing in background thread."""
+        if self.config.processing:
+            return
+            
+        if not self.config.image_items:
+            messagebox.showwarning("Warning", "No images selected. Please select some images to process.")
+            return
+        
+        # Update UI state
+        self.config.processing = True
+        self.process_btn.state(['disabled'])
+        self.cancel_btn.state(['!disabled'])
+        self.progress['value'] = 0
+        self.cancel_token = CancelToken()
+        for img_item in self.config.image_items:
+            img_item.status = "pending"
+        self.image_list.render()
+        
+        # Start processing thread
+        thread = threading.Thread(
+            target=self.process_images,
+            daemon=True
+        )
+        thread.start()
+        
+    def get_global_settings(self):
+        """Return the global defaults, keyed like SETTINGS."""
+        custom_size = self.global_custom_size_var.get().strip()
+        return {
+            "base_size": int(self.global_size_var.get()),
+            "custom_size": int(custom_size) if custom_size.isdigit() else None,
+            "images_across": self.global_images_across_var.get(),
+            "images_high": self.global_images_high_var.get(),
+            "maintain_format": self.global_maintain_format_var.get(),
+            "custom_folder": self.global_folder_name_var.get().strip() or None,
+            "encoder": self.global_encoder_var.get(),
+            "quality": None,
+        }
+
+    def get_split_jobs(self, img_items):
+        """Resolve the effective settings of a batch of images into SplitJobs.
+
+        The registry's settings table resolves the whole batch column by
+        column against the global defaults.
+        """
+        columns = self.config.image_items.settings.resolve(
+            [img_item.row for img_item in img_items], self.get_global_settings())
+        return [SplitJob(img_item.path, across, high, size, folder, keep, encoder=encoder, quality=quality)
+                for img_item, across, high, size, folder, keep, encoder, quality in zip(
+                    img_items, columns["images_across"], columns["images_high"], columns["output_size"],
+                    columns["custom_folder"], columns["maintain_format"], columns["encoder"],
+                    columns["quality"])]
+
+    def process_images(self):
+        """Process images in background thread."""
+        timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+        total_files = len(self.config.image_items)
+        # The bar counts tiles; finished_tiles covers images already reported.
+        finished_tiles = 0
+
+        def on_tile(job, written, total):
+            self.update_status(f"Processing {job.image_path.name}: tile {written}/{total}",
+                               progress=finished_tiles + written)
+
+        def on_progress(done, total, job, error):
+            nonlocal finished_tiles
+            finished_tiles += job.images_across * job.images_high
+            img_item = items_by_job.get(id(job))
+            if img_item is not None:
+                img_item.status = "failed" if error else "skipped" if job.skipped else "done"
+            if error:
+                message = f"✗ {done}/{total}: {job.image_path.name} failed: {error}"
+            elif job.skipped:
+                message = f"Skipped {done}/{total}: {job.image_path.name} (unchanged)"
+            else:
+                message = f"Processed {done}/{total}: {job.image_path.name}"
+            self.update_status(message, progress=finished_tiles)
+
+        try:
+            items = list(self.config.image_items)
+            jobs = self.get_split_jobs(items)
+            items_by_job = {id(job): img_item for job, img_item in zip(jobs, items)}
+            self.update_status(maximum=sum(job.images_across * job.images_high for job in jobs))
+            try:
+                workers = self.workers_var.get()
+            except Exception:
+                workers = 1
+            self.update_status(f"Processing {total_files} image(s) with {resolve_workers(workers)} worker(s)...")
+            manifest = OutputManifest() if self.incremental_var.get() else None
+            dedupe = SourceDeduplicator() if self.dedupe_var.get() else None
+            profiler = StageProfiler()
+            previous_profiler = set_profiler(profiler)
+            start = time.perf_counter()
+            try:
+                result = run_batch(jobs, timestamp, workers=workers, progress_callback=on_progress,
+                                   manifest=manifest, cancel_token=self.cancel_token,
+                                   tile_callback=on_tile, dedupe=dedupe)
+            finally:
+                set_profiler(previous_profiler)
+                self.last_stats = profiler.format_table(time.perf_counter() - start)
+            skipped_note = f"\nSkipped {len(result.skipped)} unchanged image(s)." if result.skipped else ""
+            if dedupe is not None and dedupe.duplicates:
+                skipped_note += f"\n{dedupe.summary()}"
+
+            if result.errors:
+                details = "\n".join(f"• {job.image_path.name}: {error}" for job, error in result.errors[:20])
+                if len(result.errors) > 20:
+                    details += f"\n… and {len(result.errors) - 20} more"
+                self.update_status(f"✗ {len(result.errors)} of {result.processed} image(s) failed")
+                messagebox.showwarning(
+                    "Completed with errors",
+                    f"Processed {len(result.completed)} image(s); {len(result.errors)} failed:\n\n{details}"
+                    f"{skipped_note}"
+                )
+            elif result.cancelled:
+                self.update_status(f"Processing cancelled after {result.processed} of {total_files} image(s)")
+            else:
+                self.update_status("✓ Processing completed successfully!")
+                messagebox.showinfo("Success", f"Processed {total_files} image(s) successfully!{skipped_note}")
+        except Exception as e:
+            self.update_status(f"✗ Error: {str(e)}")
+            messagebox.showerror("Error", f"An error occurred: {str(e)}")
+        finally:
+            self.config.processing = False
+            self.root.after(0, self.reset_ui)
+            
+    def cancel_processing(self):
+        """Cancel ongoing processing."""
+        self.config.processing = False
+        if self.cancel_token is not None:
+            self.cancel_token.cancel()
+        self.update_status("Cancelling...")
+        
+    def update_status(self, message=None, progress=None, maximum=None):
+        """Update the status message and progress bar (thread-safe).
+
+        Only the latest values are kept, and they are applied at most once
+        per STATUS_UPDATE_INTERVAL_MS, so thousands of tiles per second don't
+        flood the Tk event queue.
+        """
+        updates = {"message": message, "progress": progress, "maximum": maximum}
+        with self.status_lock:
+            self.pending_status.update((key, value) for key, value in updates.items() if value is not None)
+            if self.status_update_scheduled:
+                return
+            self.status_update_scheduled = True
+        self.root.after(STATUS_UPDATE_INTERVAL_MS, self.flush_status)
+
+    def flush_status(self):
+        """Apply the latest coalesced status and progress values."""
+        with self.status_lock:
+            pending, self.pending_status = self.pending_status, {}
+            self.status_update_scheduled = False
+        if "maximum" in pending:
+            self.progress.configure(maximum=pending["maximum"])
+        if "progress" in pending:
+            self.progress.configure(value=pending["progress"])
+        if "message" in pending:
+            self.status_var.set(pending["message"])
+        # Picks up status icons of the rows on screen.
+        self.image_list.render()
+        
+    def reset_ui(self):
+        """Reset UI to ready state."""
+        self.process_btn.state(['!disabled'])
+        self.cancel_btn.state(['disabled'])
+        # Statuses changed, so status filters may now match different images.
+        self.image_list.refresh()
+        self.validate_inputs()
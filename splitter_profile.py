@@ -0,0 +1,209 @@
+"""Per-stage timing instrumentation for the splitting engine.
+
+The engine wraps each stage (open, decode, crop, resize, save, ...) in
+``stage(name)``. That is a no-op until a StageProfiler is installed with
+set_profiler(), so normal runs pay almost nothing for it.
+"""
+import math
+import time
+import threading
+from array import array
+from contextlib import contextmanager
+
+
+STAGE_ORDER = ("mkdir", "read", "open", "decode", "crop", "resize", "save", "write")
+
+_profiler = None
+
+
+def set_profiler(profiler):
+    """Install profiler for this process and return the previous one."""
+    global _profiler
+    previous, _profiler = _profiler, profiler
+    return previous
+
+
+def get_profiler():
+    return _profiler
+
+
+@contextmanager
+def stage(name, nbytes=0):
+    """Time the enclosed block as one sample of stage ``name``."""
+    profiler = _profiler
+    if profiler is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        profiler.add(name, time.perf_counter() - start, nbytes)
+
+
+def add_bytes(name, nbytes):
+    """Attribute bytes read or written to a stage without adding a sample."""
+    if _profiler is not None:
+        _profiler.add_bytes(name, nbytes)
+
+
+def add_allocation(name, nbytes, copied=False):
+    """Count a new pixel buffer made in a stage; ``copied`` if its pixels were copied."""
+    if _profiler is not None:
+        _profiler.add_allocation(name, nbytes, copied)
+
+
+def _percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    # Nearest-rank percentile.
+    index = max(0, math.ceil(fraction * len(sorted_values)) - 1)
+    return sorted_values[index]
+
+
+class StageProfiler:
+    """Collects per-stage durations and byte counts.
+
+    Samples from several threads may be added at once. Profilers from pool
+    workers are shipped back with data() and folded in with merge().
+    With ``cprofile`` set, threads started through wrap_thread() are also
+    profiled with cProfile and can be written out with dump_cprofile().
+    Pixel buffers allocated per stage, and the bytes copied into them, are
+    counted separately from the bytes read or written.
+    """
+    def __init__(self, cprofile=False):
+        self.durations = {}
+        self.bytes = {}
+        self.allocations = {}  # stage -> [count, bytes allocated, bytes copied]
+        self.cprofile = cprofile
+        self._profiles = []
+        self._lock = threading.Lock()
+
+    def add(self, name, seconds, nbytes=0):
+        with self._lock:
+            self.durations.setdefault(name, array("d")).append(seconds)
+            if nbytes:
+                self.bytes[name] = self.bytes.get(name, 0) + nbytes
+
+    def add_bytes(self, name, nbytes):
+        with self._lock:
+            self.bytes[name] = self.bytes.get(name, 0) + nbytes
+
+    def add_allocation(self, name, nbytes, copied=False):
+        with self._lock:
+            counts = self.allocations.setdefault(name, [0, 0, 0])
+            counts[0] += 1
+            counts[1] += nbytes
+            if copied:
+                counts[2] += nbytes
+
+    def data(self):
+        """Return a picklable copy of the samples."""
+        with self._lock:
+            return {
+                "durations": {name: values.tolist() for name, values in self.durations.items()},
+                "bytes": dict(self.bytes),
+                "allocations": {name: list(counts) for name, counts in self.allocations.items()},
+            }
+
+    def merge(self, data):
+        """Fold in samples returned by data() from another process."""
+        if not data:
+            return
+        with self._lock:
+            for name, values in data["durations"].items():
+                self.durations.setdefault(name, array("d")).extend(values)
+            for name, nbytes in data["bytes"].items():
+                self.bytes[name] = self.bytes.get(name, 0) + nbytes
+            for name, counts in data.get("allocations", {}).items():
+                totals = self.allocations.setdefault(name, [0, 0, 0])
+                for index, value in enumerate(counts):
+                    totals[index] += value
+
+    def summary(self):
+        """Return one row of statistics per stage, in pipeline order."""
+        with self._lock:
+            names = sorted(set(self.durations) | set(self.bytes) | set(self.allocations),
+                           key=lambda name: (STAGE_ORDER.index(name) if name in STAGE_ORDER else len(STAGE_ORDER), name))
+            rows = []
+            for name in names:
+                values = sorted(self.durations.get(name, ()))
+                total = sum(values)
+                allocs, alloc_bytes, copied = self.allocations.get(name, (0, 0, 0))
+                rows.append({
+                    "stage": name,
+                    "count": len(values),
+                    "total_s": total,
+                    "mean_ms": total / len(values) * 1000 if values else 0.0,
+                    "p50_ms": _percentile(values, 0.50) * 1000,
+                    "p90_ms": _percentile(values, 0.90) * 1000,
+                    "p99_ms": _percentile(values, 0.99) * 1000,
+                    "max_ms": values[-1] * 1000 if values else 0.0,
+                    "mb": self.bytes.get(name, 0) / (1024 * 1024),
+                    "allocs": allocs,
+                    "alloc_mb": alloc_bytes / (1024 * 1024),
+                    "copied_mb": copied / (1024 * 1024),
+                })
+            return rows
+
+    def format_table(self, wall_seconds=None):
+        """Render summary() as a fixed-width text table."""
+        header = (f"{'Stage':<8} {'Count':>7} {'Total s':>9} {'Mean ms':>9} {'p50 ms':>8} {'p90 ms':>8} "
+                  f"{'p99 ms':>8} {'Max ms':>8} {'MB':>9} {'Allocs':>7} {'Alloc MB':>9} {'Copy MB':>9}")
+        lines = [header, "-" * len(header)]
+        for row in self.summary():
+            lines.append(
+                f"{row['stage']:<8} {row['count']:>7} {row['total_s']:>9.3f} {row['mean_ms']:>9.2f} "
+                f"{row['p50_ms']:>8.2f} {row['p90_ms']:>8.2f} {row['p99_ms']:>8.2f} {row['max_ms']:>8.2f} "
+                f"{row['mb']:>9.1f} {row['allocs']:>7} {row['alloc_mb']:>9.1f} {row['copied_mb']:>9.1f}"
+            )
+        if wall_seconds is not None:
+            lines.append(f"Wall time {wall_seconds:.3f}s. Stage totals add up across threads and "
+                         f"worker processes, so they can exceed it.")
+        return "\n".join(lines)
+
+    def start_cprofile(self):
+        """Start cProfile on the calling thread; returns the profile object."""
+        import cProfile
+
+        profile = cProfile.Profile()
+        with self._lock:
+            self._profiles.append(profile)
+        profile.enable()
+        return profile
+
+    def wrap_thread(self, target):
+        """Return target wrapped so it runs under cProfile when enabled."""
+        if not self.cprofile:
+            return target
+
+        def run(*args, **kwargs):
+            profile = self.start_cprofile()
+            try:
+                return target(*args, **kwargs)
+            finally:
+                profile.disable()
+        return run
+
+    def dump_cprofile(self, path):
+        """Write the combined cProfile statistics of every profiled thread."""
+        import pstats
+
+        with self._lock:
+            profiles = list(self._profiles)
+        if not profiles:
+            return False
+        for profile in profiles:
+            profile.disable()
+        stats = pstats.Stats(profiles[0])
+        for profile in profiles[1:]:
+            stats.add(profile)
+        stats.dump_stats(str(path))
+        return True
+
+
+def wrap_thread(target):
+    """Wrap a thread target for cProfile if the installed profiler wants it."""
+    if _profiler is None:
+        return target
+    return _profiler.wrap_thread(target)
@@ -0,0 +1,258 @@
+"""Durable, lease-based work queue for splitting one batch on several hosts.
+
+The queue is an SQLite database, normally on storage every worker can
+reach. Each row is one SplitJob. A worker leases rows, renews its leases
+while it works, and marks each one done or failed. Rows leased by a worker
+that crashed go back to the queue when their lease expires. Finished rows
+are never leased again, so a batch picks up exactly where it stopped.
+
+SQLite relies on the file system's locks. They hold on local disks and on
+NFS with working locking. The journal stays in the default rollback mode,
+because WAL needs shared memory that network file systems don't provide.
+"""
+import os
+import json
+import time
+import socket
+import sqlite3
+import threading
+
+from splitter_engine import CancelToken, SplitJob, run_batch
+
+
+QUEUE_VERSION = 1
+
+# Leases last this long unless renewed; workers renew theirs every
+# DEFAULT_LEASE_SECONDS / 3 seconds while the jobs are in flight.
+DEFAULT_LEASE_SECONDS = 60
+
+# A job whose lease has expired this many times is marked failed instead of
+# being handed to yet another worker; it probably crashes whoever takes it.
+MAX_LEASE_ATTEMPTS = 3
+
+# How long an idle worker waits before looking at the queue again while
+# other workers still hold leases.
+QUEUE_POLL_SECONDS = 2
+
+# SplitJob arguments stored with each row, besides the image path.
+JOB_FIELDS = ("images_across", "images_high", "output_size", "custom_folder", "maintain_format",
+              "tiling", "max_memory_mb", "encoder", "quality", "resample_tier")
+
+STATES = ("pending", "leased", "done", "failed")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL,
+    settings TEXT NOT NULL,
+    state TEXT NOT NULL DEFAULT 'pending',
+    worker TEXT,
+    lease_expires REAL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    tiles INTEGER,
+    error TEXT,
+    UNIQUE (path, settings)
+);
+CREATE INDEX IF NOT EXISTS jobs_state ON jobs (state, id);
+"""
+
+
+def default_worker_id():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+class WorkQueue:
+    """A batch of split jobs in an SQLite database shared by its workers.
+
+    ``timestamp`` is fixed when the queue is created, so every worker puts
+    single-tile output into the same timestamped folder. The connection
+    may be used from several threads of one process.
+    """
+    def __init__(self, path, timestamp=None):
+        self.path = path
+        # Autocommit mode; writes take the lock explicitly with BEGIN IMMEDIATE.
+        self._db = sqlite3.connect(path, timeout=60, isolation_level=None, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._db.executescript(_SCHEMA)
+            self._db.execute("INSERT OR IGNORE INTO meta VALUES ('version', ?)", (str(QUEUE_VERSION),))
+            if timestamp is not None:
+                self._db.execute("INSERT OR IGNORE INTO meta VALUES ('timestamp', ?)", (timestamp,))
+            rows = dict(self._db.execute("SELECT key, value FROM meta"))
+        if rows.get("version") != str(QUEUE_VERSION):
+            raise ValueError(f"{path} is a version {rows.get('version')} queue; expected {QUEUE_VERSION}")
+        self.timestamp = rows.get("timestamp")
+
+    def close(self):
+        self._db.close()
+
+    def _write(self, statements):
+        """Run (sql, parameters) pairs in one transaction; returns the cursors' rowcounts."""
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                counts = [self._db.execute(sql, parameters).rowcount for sql, parameters in statements]
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+            self._db.execute("COMMIT")
+        return counts
+
+    def enqueue(self, jobs, chunk=1000):
+        """Add SplitJobs; jobs already queued with the same settings are left alone.
+
+        Paths are stored absolute, so workers may run from any directory.
+
+        Returns the number of jobs added.
+        """
+        added = 0
+        batch = []
+        for job in jobs:
+            settings = json.dumps({name: getattr(job, name) for name in JOB_FIELDS}, sort_keys=True)
+            batch.append(("INSERT OR IGNORE INTO jobs (path, settings) VALUES (?, ?)",
+                          (os.path.abspath(job.image_path), settings)))
+            if len(batch) >= chunk:
+                added += sum(self._write(batch))
+                batch = []
+        if batch:
+            added += sum(self._write(batch))
+        return added
+
+    def lease(self, worker, lease_seconds=DEFAULT_LEASE_SECONDS):
+        """Lease the next pending or abandoned job to worker.
+
+        Returns ``(row id, SplitJob)``, or None if nothing is available.
+        """
+        now = time.time()
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                self._db.execute(
+                    "UPDATE jobs SET state = 'failed', worker = NULL, "
+                    "error = 'Lease expired ' || attempts || ' times; the job may crash workers' "
+                    "WHERE state = 'leased' AND lease_expires < ? AND attempts >= ?",
+                    (now, MAX_LEASE_ATTEMPTS))
+                row = self._db.execute(
+                    "SELECT id, path, settings FROM jobs WHERE state = 'pending' "
+                    "OR (state = 'leased' AND lease_expires < ?) ORDER BY id LIMIT 1", (now,)).fetchone()
+                if row is not None:
+                    self._db.execute(
+                        "UPDATE jobs SET state = 'leased', worker = ?, lease_expires = ?, "
+                        "attempts = attempts + 1 WHERE id = ?", (worker, now + lease_seconds, row[0]))
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+            self._db.execute("COMMIT")
+        if row is None:
+            return None
+        row_id, path, settings = row
+        return row_id, SplitJob(path, **json.loads(settings))
+
+    def renew(self, worker, lease_seconds=DEFAULT_LEASE_SECONDS):
+        """Extend every lease worker holds; returns how many it holds."""
+        return self._write([("UPDATE jobs SET lease_expires = ? WHERE state = 'leased' AND worker = ?",
+                             (time.time() + lease_seconds, worker))])[0]
+
+    def finish(self, row_id, worker, error=None, tiles=None):
+        """Mark a leased job done, or failed with error.
+
+        Returns False if worker no longer held the lease (it expired and the
+        job went to another worker), in which case nothing changes.
+        """
+        state = "done" if error is None else "failed"
+        return self._write([("UPDATE jobs SET state = ?, worker = NULL, lease_expires = NULL, "
+                             "error = ?, tiles = ? WHERE id = ? AND state = 'leased' AND worker = ?",
+                             (state, error, tiles, row_id, worker))])[0] == 1
+
+    def release(self, worker):
+        """Return every job leased to worker to the queue, e.g. after cancelling."""
+        return self._write([("UPDATE jobs SET state = 'pending', worker = NULL, lease_expires = NULL, "
+                             "attempts = MAX(attempts - 1, 0) WHERE state = 'leased' AND worker = ?",
+                             (worker,))])[0]
+
+    def retry_failed(self):
+        """Put failed jobs back in the queue; returns how many."""
+        return self._write([("UPDATE jobs SET state = 'pending', attempts = 0, error = NULL "
+                             "WHERE state = 'failed'", ())])[0]
+
+    def counts(self):
+        """Return the number of jobs in each state."""
+        with self._lock:
+            rows = dict(self._db.execute("SELECT state, COUNT(*) FROM jobs GROUP BY state"))
+        return {state: rows.get(state, 0) for state in STATES}
+
+    def failures(self, limit=20):
+        """Return (path, error) for up to limit failed jobs."""
+        with self._lock:
+            return self._db.execute("SELECT path, error FROM jobs WHERE state = 'failed' ORDER BY id "
+                                    "LIMIT ?", (limit,)).fetchall()
+
+
+def drain(work_queue, worker=None, workers=1, lease_seconds=DEFAULT_LEASE_SECONDS,
+          progress_callback=None, cancel_token=None):
+    """Split jobs from work_queue until none are left, then return the number done here.
+
+    Jobs are leased one at a time as run_batch() asks for them, and a
+    background thread renews this worker's leases. While other workers still
+    hold leases, this one waits for them to finish or expire, so it can take
+    over work abandoned by a crash. ``progress_callback(job, error)`` is
+    called as each job finishes.
+    """
+    worker = worker or default_worker_id()
+    cancel_token = cancel_token or CancelToken()
+    stop = threading.Event()
+    done = 0
+
+    def heartbeat():
+        while not stop.wait(lease_seconds / 3):
+            try:
+                work_queue.renew(worker, lease_seconds)
+            except sqlite3.Error as exc:
+                print(f"Warning: Could not renew leases in {work_queue.path}: {exc}")
+
+    renewer = threading.Thread(target=heartbeat, daemon=True)
+    renewer.start()
+    try:
+        while not cancel_token.cancelled:
+            rows = {}
+
+            def leased_jobs():
+                while not cancel_token.cancelled:
+                    leased = work_queue.lease(worker, lease_seconds)
+                    if leased is None:
+                        return
+                    rows[id(leased[1])] = leased[0]
+                    yield leased[1]
+
+            def on_progress(_done, _total, job, error):
+                nonlocal done
+                row_id = rows.pop(id(job))
+                tiles = None if error else job.images_across * job.images_high
+                if not work_queue.finish(row_id, worker, error, tiles):
+                    print(f"Warning: Lease on {job.image_path} expired before it finished; "
+                          f"another worker redoes it")
+                elif error is None:
+                    done += 1
+                if progress_callback:
+                    progress_callback(job, error)
+
+            run_batch(leased_jobs(), work_queue.timestamp, workers=workers,
+                      progress_callback=on_progress, cancel_token=cancel_token)
+            if rows:
+                # Cancelled mid-round; hand the unfinished jobs back.
+                work_queue.release(worker)
+            counts = work_queue.counts()
+            if not counts["pending"] and not counts["leased"]:
+                break
+            if not counts["pending"]:
+                # Others still hold leases; one may have crashed, so wait and see.
+                stop.wait(QUEUE_POLL_SECONDS)
+    except KeyboardInterrupt:
+        # Let other workers take over now rather than when the leases expire.
+        work_queue.release(worker)
+        raise
+    finally:
+        stop.set()
+        renewer.join()
+    return done
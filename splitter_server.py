@@ -0,0 +1,351 @@
+"""Local HTTP service that splits images posted to it.
+
+``POST /split`` takes the image file as the request body and the split
+settings as query parameters, and answers with the tiles as a zip file
+or a multipart/mixed response. ``GET /health`` reports whether the
+service is up along with its counters. Images are split in a WarmPool,
+so a request pays for neither interpreter start-up nor a trip to disk.
+
+Requests are bounded in two ways. An upload larger than the size cap is
+refused with 413 before its body is read. Once ``max_pending`` requests
+are being split or are waiting for a worker, further requests get 503
+with Retry-After. Memory held in uploads is therefore capped at
+``max_pending`` times the upload cap.
+"""
+import io
+import json
+import time
+import uuid
+import signal
+import zipfile
+import threading
+from concurrent.futures import BrokenExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import PurePath
+from urllib.parse import parse_qs, urlsplit
+
+from PIL import Image
+
+from splitter_engine import (
+    DEFAULT_ENCODER,
+    DEFAULT_MAX_MEMORY_MB,
+    DEFAULT_RESAMPLE,
+    ENCODER_PRESETS,
+    RESAMPLE_TIERS,
+    TILING_MODES,
+    SplitJob,
+    WarmPool,
+)
+from splitter_settings import JOB_DEFAULTS
+
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+DEFAULT_MAX_UPLOAD_MB = 64
+
+# Requests allowed to wait for a busy worker, per worker, before further
+# ones are turned away with 503.
+DEFAULT_PENDING_PER_WORKER = 2
+
+# Caps on what one request may ask for, so a single request can't tie a
+# worker up for minutes or build a multi-gigabyte response.
+MAX_TILES = 1024
+MAX_OUTPUT_SIZE = 8192
+
+# Seconds a client has to send each part of its request.
+REQUEST_TIMEOUT = 30
+
+OUTPUT_TYPES = ("zip", "multipart")
+
+COUNTERS = ("requests", "split", "tiles", "bytes_in", "bytes_out", "bad_request", "too_large", "busy",
+            "failed")
+
+
+def _int_param(params, name, default, maximum=None):
+    value = params.get(name, default)
+    try:
+        value = int(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"{name} must be a whole number, not {value!r}") from None
+    if value < 1 or (maximum is not None and value > maximum):
+        raise ValueError(f"{name} must be between 1 and {maximum}" if maximum else f"{name} must be positive")
+    return value
+
+
+def _choice_param(params, name, default, choices):
+    value = params.get(name, default)
+    if value not in choices:
+        raise ValueError(f"{name} must be one of {', '.join(choices)}")
+    return value
+
+
+def parse_split_query(query, max_memory_mb=DEFAULT_MAX_MEMORY_MB):
+    """Turn the query string of a /split request into ``(SplitJob, output type)``.
+
+    The parameters are named like the command line options: ``across``,
+    ``high``, ``size``, ``encoder``, ``quality``, ``tiling`` and
+    ``resample``. ``format`` is ``jpeg`` (the default) or ``source``,
+    ``name`` is the stem the tiles are named after, and ``output`` is
+    ``zip`` or ``multipart``. Raises ValueError for invalid values.
+    """
+    params = {name: values[-1] for name, values in parse_qs(query).items()}
+    images_across = _int_param(params, "across", JOB_DEFAULTS["images_across"], MAX_TILES)
+    images_high = _int_param(params, "high", JOB_DEFAULTS["images_high"], MAX_TILES)
+    if images_across * images_high > MAX_TILES:
+        raise ValueError(f"at most {MAX_TILES} tiles per request")
+    output_size = _int_param(params, "size", JOB_DEFAULTS["base_size"], MAX_OUTPUT_SIZE)
+    img_format = _choice_param(params, "format", "jpeg", ("jpeg", "source"))
+    encoder = _choice_param(params, "encoder", DEFAULT_ENCODER, tuple(ENCODER_PRESETS))
+    quality = _int_param(params, "quality", None, 100) if "quality" in params else None
+    tiling = _choice_param(params, "tiling", "auto", TILING_MODES)
+    resample_tier = _choice_param(params, "resample", DEFAULT_RESAMPLE, tuple(RESAMPLE_TIERS))
+    output = _choice_param(params, "output", "zip", OUTPUT_TYPES)
+    # Only the stem is kept, so a client can't smuggle a path into the zip.
+    name = PurePath(params.get("name", "")).stem or "tile"
+    job = SplitJob(name, images_across, images_high, output_size, None, img_format == "source",
+                   tiling, max_memory_mb, encoder, quality, resample_tier)
+    return job, output
+
+
+def tile_name(job, count, img_format):
+    """Return the file name a tile gets in responses, as on disk."""
+    return f"{job.image_path.stem}_part_{count}.{img_format.lower()}"
+
+
+class SplitRequestHandler(BaseHTTPRequestHandler):
+    """Handles /split and /health for a SplitServer."""
+    server_version = "Splitter/1.0"
+    protocol_version = "HTTP/1.1"
+    timeout = REQUEST_TIMEOUT
+
+    def _send(self, status, content_type, body=b"", headers=()):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in headers:
+            self.send_header(name, value)
+        if self.close_connection:
+            self.send_header("Connection", "close")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_json(self, status, payload, headers=()):
+        body = (json.dumps(payload, ensure_ascii=False) + "\n").encode("utf-8")
+        self._send(status, "application/json", body, headers)
+
+    def _refuse(self, status, counter, message, headers=()):
+        """Answer with an error and close the connection, whose body may be unread."""
+        self.server.count(counter)
+        self.close_connection = True
+        self._send_json(status, {"error": message}, headers)
+
+    def do_GET(self):
+        if urlsplit(self.path).path != "/health":
+            self.close_connection = True
+            self._send_json(404, {"error": "Not found; use POST /split or GET /health"})
+            return
+        health = self.server.health()
+        self._send_json(200 if health["status"] == "ok" else 503, health)
+
+    def do_POST(self):
+        server = self.server
+        server.count("requests")
+        url = urlsplit(self.path)
+        if url.path != "/split":
+            self._refuse(404, "bad_request", "Not found; use POST /split or GET /health")
+            return
+        try:
+            job, output = parse_split_query(url.query, server.max_memory_mb)
+        except ValueError as exc:
+            self._refuse(400, "bad_request", str(exc))
+            return
+        length = self.headers.get("Content-Length")
+        if length is None:
+            self._refuse(411, "bad_request", "Send the image with a Content-Length")
+            return
+        try:
+            length = int(length)
+        except ValueError:
+            length = -1
+        if length <= 0:
+            self._refuse(400, "bad_request", "Send the image file as the request body")
+            return
+        if length > server.max_upload:
+            self._refuse(413, "too_large", f"Images are limited to {server.max_upload // (1024 * 1024)} MB")
+            return
+        # Taken before reading the body, so waiting uploads are bounded too.
+        if not server.acquire():
+            self._refuse(503, "busy", "All workers are busy; try again shortly", [("Retry-After", "1")])
+            return
+        try:
+            self._split(job, output, length)
+        finally:
+            server.release()
+
+    def _split(self, job, output, length):
+        server = self.server
+        try:
+            data = self.rfile.read(length)
+        except OSError:
+            data = b""
+        if len(data) < length:
+            # The client went away or stalled past REQUEST_TIMEOUT.
+            self.close_connection = True
+            return
+        server.count("bytes_in", length)
+        start = time.perf_counter()
+        try:
+            tiles = server.pool.encode(job, data).result()
+        except BrokenExecutor as exc:
+            server.broken = True
+            self._refuse(500, "failed", f"Worker pool failed: {exc or type(exc).__name__}")
+            return
+        except Image.DecompressionBombError as exc:
+            self._refuse(413, "too_large", str(exc))
+            return
+        except Exception as exc:
+            self._refuse(422, "failed", f"Cannot split image: {exc or type(exc).__name__}")
+            return
+        finally:
+            del data
+        elapsed = time.perf_counter() - start
+        headers = [("X-Tiles-Across", str(job.images_across)), ("X-Tiles-High", str(job.images_high)),
+                   ("X-Split-Seconds", f"{elapsed:.3f}")]
+        if output == "zip":
+            sent = self._send_zip(job, tiles, headers)
+        else:
+            sent = self._send_multipart(job, tiles, headers)
+        server.finished(len(tiles), sent, elapsed)
+
+    def _send_zip(self, job, tiles, headers):
+        buffer = io.BytesIO()
+        # Tiles are already compressed images; storing them keeps this cheap.
+        with zipfile.ZipFile(buffer, "w", zipfile.ZIP_STORED) as archive:
+            for count, img_format, data in tiles:
+                archive.writestr(tile_name(job, count, img_format), data)
+        body = buffer.getvalue()
+        headers.append(("Content-Disposition", f'attachment; filename="{job.image_path.stem}_tiles.zip"'))
+        self._send(200, "application/zip", body, headers)
+        return len(body)
+
+    def _send_multipart(self, job, tiles, headers):
+        """Write one part per tile, straight from the encoded tiles."""
+        boundary = uuid.uuid4().hex
+        parts = []
+        for count, img_format, data in tiles:
+            row, column = divmod(count - 1, job.images_across)
+            head = (f"--{boundary}\r\n"
+                    f"Content-Type: {Image.MIME.get(img_format, 'application/octet-stream')}\r\n"
+                    f'Content-Disposition: attachment; filename="{tile_name(job, count, img_format)}"\r\n'
+                    f"X-Tile: {count}\r\nX-Tile-Row: {row}\r\nX-Tile-Column: {column}\r\n\r\n")
+            parts.append((head.encode("ascii"), data))
+        tail = f"--{boundary}--\r\n".encode("ascii")
+        length = sum(len(head) + len(data) + 2 for head, data in parts) + len(tail)
+        self.send_response(200)
+        self.send_header("Content-Type", f"multipart/mixed; boundary={boundary}")
+        self.send_header("Content-Length", str(length))
+        for name, value in headers:
+            self.send_header(name, value)
+        self.end_headers()
+        for head, data in parts:
+            self.wfile.write(head)
+            self.wfile.write(data)
+            self.wfile.write(b"\r\n")
+        self.wfile.write(tail)
+        return length
+
+
+class SplitServer(ThreadingHTTPServer):
+    """HTTP server that splits posted images in a pool of warm workers.
+
+    Each connection gets a thread, but at most ``max_pending`` requests
+    (default DEFAULT_PENDING_PER_WORKER per worker) hold an upload or a
+    worker at a time.
+    """
+    daemon_threads = True
+
+    def __init__(self, address, workers=1, max_pending=None, max_upload_mb=DEFAULT_MAX_UPLOAD_MB,
+                 max_memory_mb=DEFAULT_MAX_MEMORY_MB):
+        super().__init__(address, SplitRequestHandler)
+        # Registers every format's MIME type for the multipart responses.
+        Image.init()
+        try:
+            self.pool = WarmPool(workers)
+        except BaseException:
+            self.server_close()
+            raise
+        self.max_pending = max_pending or self.pool.workers * DEFAULT_PENDING_PER_WORKER
+        self.max_upload = max_upload_mb * 1024 * 1024
+        self.max_memory_mb = max_memory_mb
+        self.broken = False
+        self._started = time.monotonic()
+        self._lock = threading.Lock()
+        self._counters = dict.fromkeys(COUNTERS, 0)
+        self._pending = 0
+        self._split_seconds = 0.0
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/"
+
+    def acquire(self):
+        """Take one of the max_pending slots; returns False if none is free."""
+        with self._lock:
+            if self._pending >= self.max_pending:
+                return False
+            self._pending += 1
+            return True
+
+    def release(self):
+        with self._lock:
+            self._pending -= 1
+
+    def count(self, counter, amount=1):
+        with self._lock:
+            self._counters[counter] += amount
+
+    def finished(self, tiles, bytes_out, seconds):
+        with self._lock:
+            self._counters["split"] += 1
+            self._counters["tiles"] += tiles
+            self._counters["bytes_out"] += bytes_out
+            self._split_seconds += seconds
+
+    def health(self):
+        """Return the service's status and counters."""
+        with self._lock:
+            counters = dict(self._counters)
+            split_seconds = self._split_seconds
+            pending = self._pending
+        return {
+            "status": "broken" if self.broken else "ok",
+            "uptime_seconds": round(time.monotonic() - self._started, 1),
+            "workers": self.pool.workers,
+            "max_pending": self.max_pending,
+            "pending": pending,
+            **counters,
+            "mean_split_seconds": round(split_seconds / counters["split"], 4) if counters["split"] else None,
+        }
+
+    def close(self):
+        """Stop the workers and release the listening socket."""
+        self.server_close()
+        self.pool.close(cancel=True)
+
+
+def serve(server, on_event=print):
+    """Serve requests until interrupted by Ctrl+C or SIGTERM, then close server."""
+    def stop(signum, frame):
+        raise KeyboardInterrupt
+
+    previous_handler = signal.signal(signal.SIGTERM, stop)
+    try:
+        on_event(f"Serving on {server.url} ({server.pool.workers} warm worker(s), up to "
+                 f"{server.max_pending} request(s) at once). Press Ctrl+C to stop.")
+        server.serve_forever()
+    except KeyboardInterrupt:
+        on_event("Stopping...")
+    finally:
+        signal.signal(signal.SIGTERM, previous_handler)
+        server.close()
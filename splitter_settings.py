@@ -0,0 +1,319 @@
+"""Per-image setting overrides: in-memory storage and job files.
+
+Each image gets a row index into a SettingsTable. Every setting is one
+``array`` column holding a small integer per row, with INHERIT (0) meaning
+"use the global default", so a large batch costs a few bytes per image
+instead of a Python object per setting, and the effective settings of the
+whole batch resolve column by column in resolve().
+
+Job files carry the same defaults and overrides to headless runs, one JSON
+object per line (see iter_job_file()).
+"""
+import os
+import sys
+import json
+from array import array
+from pathlib import Path
+
+from splitter_engine import DEFAULT_ENCODER, DEFAULT_RESAMPLE, ENCODER_PRESETS, SplitJob
+
+
+INHERIT = 0
+
+# maintain_format is stored as INHERIT, FORMAT_CONVERT or FORMAT_KEEP.
+FORMAT_CONVERT = 1
+FORMAT_KEEP = 2
+
+# The encoder column stores a preset's position in ENCODER_NAMES plus one.
+ENCODER_NAMES = tuple(ENCODER_PRESETS)
+
+# Highest quality an override can hold; larger values are clamped to it.
+MAX_QUALITY = 100
+
+SIZE_COLUMNS = ("base_size", "custom_size", "images_across", "images_high")
+SETTINGS = SIZE_COLUMNS + ("maintain_format", "custom_folder", "encoder", "quality")
+
+# What a job file falls back to for settings its defaults leave out; the
+# same as the command line defaults.
+JOB_DEFAULTS = {
+    "base_size": 512,
+    "custom_size": None,
+    "images_across": 1,
+    "images_high": 1,
+    "maintain_format": False,
+    "custom_folder": None,
+    "encoder": DEFAULT_ENCODER,
+    "quality": None,
+}
+
+
+class SettingsTable:
+    """Per-image overrides stored column by column.
+
+    Size and grid columns hold the value itself, or INHERIT. Folder names
+    are interned: the custom_folder column holds an index into ``folders``,
+    whose entry 0 is the empty name that stands for INHERIT. Rows freed by
+    free_row() are reused by the next add_row().
+    """
+    def __init__(self):
+        self.columns = {name: array("I") for name in SIZE_COLUMNS}
+        self.columns["maintain_format"] = array("B")
+        self.columns["custom_folder"] = array("I")
+        self.columns["encoder"] = array("B")
+        self.columns["quality"] = array("B")
+        self.folders = [""]
+        self._folder_ids = {"": INHERIT}
+        self._free = []
+
+    def __len__(self):
+        return len(self.columns["base_size"]) - len(self._free)
+
+    def add_row(self):
+        """Return the index of a new row that inherits every setting."""
+        if self._free:
+            return self._free.pop()
+        for column in self.columns.values():
+            column.append(INHERIT)
+        return len(self.columns["base_size"]) - 1
+
+    def free_row(self, row):
+        self.reset(row)
+        self._free.append(row)
+
+    def reset(self, row):
+        """Make row inherit every setting again."""
+        for column in self.columns.values():
+            column[row] = INHERIT
+
+    def clear(self):
+        for column in self.columns.values():
+            del column[:]
+        del self.folders[1:]
+        self._folder_ids = {"": INHERIT}
+        self._free = []
+
+    def get(self, row, name):
+        """Return the override for one setting, or None if it is inherited."""
+        value = self.columns[name][row]
+        if value == INHERIT:
+            return None
+        if name == "maintain_format":
+            return value == FORMAT_KEEP
+        if name == "custom_folder":
+            return self.folders[value]
+        if name == "encoder":
+            return ENCODER_NAMES[value - 1]
+        return value
+
+    def set(self, row, name, value):
+        """Store an override; None (or an empty folder name) inherits.
+
+        Sizes, grid counts and quality may be given as text, as a spinbox
+        holds them. Blank, non-numeric and non-positive values inherit, and
+        values too large for the column are clamped.
+        """
+        if value is None:
+            stored = INHERIT
+        elif name == "maintain_format":
+            stored = FORMAT_KEEP if value else FORMAT_CONVERT
+        elif name == "custom_folder":
+            stored = self._folder_ids.get(value)
+            if stored is None:
+                stored = self._folder_ids[value] = len(self.folders)
+                self.folders.append(value)
+        elif name == "encoder":
+            stored = ENCODER_NAMES.index(value) + 1
+        else:
+            column = self.columns[name]
+            limit = MAX_QUALITY if name == "quality" else (1 << 8 * column.itemsize) - 1
+            try:
+                stored = int(value)
+            except (TypeError, ValueError, OverflowError):
+                stored = INHERIT
+            stored = min(stored, limit) if stored > 0 else INHERIT
+        self.columns[name][row] = stored
+
+    def overrides(self, row):
+        """Return the overrides stored in row, as a dict."""
+        values = {name: self.get(row, name) for name in SETTINGS}
+        return {name: value for name, value in values.items() if value is not None}
+
+    def has_overrides(self, row):
+        for column in self.columns.values():
+            if column[row] != INHERIT:
+                return True
+        return False
+
+    def resolve(self, rows, defaults):
+        """Return the effective settings of rows against the global defaults.
+
+        ``defaults`` maps every name in SETTINGS to its global value, as in
+        JOB_DEFAULTS. The result maps output_size, images_across,
+        images_high, custom_folder, maintain_format, encoder and quality to
+        a list each, in the order of ``rows``. An image's custom size wins
+        over its base size, which wins over the global custom and base size.
+        """
+        columns = self.columns
+        output_size = defaults["custom_size"] or defaults["base_size"]
+        custom = self._take(columns["custom_size"], rows)
+        base = self._take(columns["base_size"], rows)
+        quality = defaults["quality"]
+        # Lookup tables turn the stored codes into values without branching.
+        folders = list(self.folders)
+        folders[INHERIT] = defaults["custom_folder"]
+        formats = (defaults["maintain_format"], False, True)
+        encoders = (defaults["encoder"],) + ENCODER_NAMES
+        return {
+            "output_size": [c or b or output_size for c, b in zip(custom, base)],
+            "images_across": [value or defaults["images_across"]
+                              for value in self._take(columns["images_across"], rows)],
+            "images_high": [value or defaults["images_high"]
+                            for value in self._take(columns["images_high"], rows)],
+            "custom_folder": [folders[index] for index in self._take(columns["custom_folder"], rows)],
+            "maintain_format": [formats[code] for code in self._take(columns["maintain_format"], rows)],
+            "encoder": [encoders[code] for code in self._take(columns["encoder"], rows)],
+            "quality": [value or quality for value in self._take(columns["quality"], rows)],
+        }
+
+    @staticmethod
+    def _take(column, rows):
+        if rows is None:
+            return column
+        return [column[row] for row in rows]
+
+
+def check_settings(settings, where):
+    """Return the valid settings in a job file record, warning about the rest."""
+    valid = {}
+    for name, value in settings.items():
+        if name not in SETTINGS:
+            print(f"Warning: {where}: unknown setting {name!r} ignored")
+            continue
+        if value is None or value == "":
+            continue
+        if name == "maintain_format":
+            ok = isinstance(value, bool)
+        elif name == "custom_folder":
+            ok = isinstance(value, str)
+        elif name == "encoder":
+            ok = value in ENCODER_PRESETS
+        elif name == "quality":
+            ok = isinstance(value, int) and not isinstance(value, bool) and 1 <= value <= 100
+        else:
+            ok = isinstance(value, int) and not isinstance(value, bool) and value > 0
+        if ok:
+            valid[name] = value
+        else:
+            print(f"Warning: {where}: invalid {name} {value!r} ignored")
+    return valid
+
+
+def _job_from_record(record, defaults, base_dir, where, tiling, max_memory_mb, resample_tier):
+    path = record.get("path")
+    if not isinstance(path, str) or not path:
+        print(f"Warning: {where}: no image path, skipped")
+        return None
+    overrides = check_settings({key: value for key, value in record.items() if key != "path"}, where)
+    settings = dict(defaults, **overrides)
+    # Same precedence as SettingsTable.resolve(): the image's own sizes first.
+    output_size = (overrides.get("custom_size") or overrides.get("base_size")
+                   or defaults["custom_size"] or defaults["base_size"])
+    return SplitJob(Path(base_dir, os.path.expanduser(path)), settings["images_across"],
+                    settings["images_high"], output_size, settings["custom_folder"],
+                    settings["maintain_format"], tiling, max_memory_mb,
+                    settings["encoder"], settings["quality"], resample_tier)
+
+
+class JobFileError(ValueError):
+    """A job file that can't be read at all, as opposed to one bad line."""
+
+
+def _iter_records(handle, name):
+    """Yield ``(where, record)`` for the JSON values in a job file."""
+    for line_number, line in enumerate(handle, 1):
+        if not line.strip():
+            continue
+        where = f"{name} line {line_number}"
+        try:
+            record = json.loads(line)
+        except ValueError as exc:
+            if line_number == 1 and line.strip() in ("{", "["):
+                # Pretty-printed JSON rather than JSON Lines; read it whole.
+                try:
+                    document = json.loads(line + handle.read())
+                except json.JSONDecodeError as exc:
+                    raise JobFileError(f"{name} line {exc.lineno}: not valid JSON ({exc.msg})") from None
+                if isinstance(document, list):
+                    # An array of the records a JSON Lines file has one per line.
+                    for index, record in enumerate(document):
+                        yield f"{name} item {index}", record
+                else:
+                    yield where, document
+                return
+            print(f"Warning: {where}: not valid JSON ({exc}), skipped")
+            continue
+        yield where, record
+
+
+def _iter_jobs(handle, name, base_dir, tiling, max_memory_mb, resample_tier):
+    defaults = dict(JOB_DEFAULTS)
+    try:
+        for where, record in _iter_records(handle, name):
+            if not isinstance(record, dict):
+                print(f"Warning: {where}: expected a JSON object, skipped")
+                continue
+            if "defaults" in record:
+                defaults.update(check_settings(record["defaults"] or {}, f"{where} defaults"))
+            for index, image in enumerate(record.get("images") or ()):
+                if isinstance(image, dict):
+                    job = _job_from_record(image, defaults, base_dir, f"{where} images[{index}]",
+                                           tiling, max_memory_mb, resample_tier)
+                    if job is not None:
+                        yield job
+            if "path" in record:
+                job = _job_from_record(record, defaults, base_dir, where, tiling, max_memory_mb,
+                                       resample_tier)
+                if job is not None:
+                    yield job
+    finally:
+        if handle is not sys.stdin:
+            handle.close()
+
+
+def iter_job_file(path, tiling="auto", max_memory_mb=None, resample_tier=DEFAULT_RESAMPLE):
+    """Yield a SplitJob per image in a job file, reading it as it goes.
+
+    A job file is JSON Lines. A ``{"defaults": {...}}`` line sets the
+    settings of the images after it; every other line is an image,
+    ``{"path": "...", ...}``, with its own overrides of those defaults.
+    Setting names are those of SETTINGS. A single JSON document of the
+    form ``{"defaults": {...}, "images": [...]}``, or an array of the
+    records a JSON Lines file would hold, is accepted too, but is read in
+    one go. Relative image paths are taken relative to the job file;
+    ``path`` "-" reads the job from stdin. The file is opened straight
+    away, so a missing job file raises OSError here; malformed lines are
+    warned about and skipped while the batch runs, and a malformed single
+    document raises JobFileError then.
+    """
+    if path == "-":
+        return _iter_jobs(sys.stdin, "stdin", Path.cwd(), tiling, max_memory_mb, resample_tier)
+    handle = open(path, "r", encoding="utf-8")
+    return _iter_jobs(handle, Path(path).name, Path(path).resolve().parent, tiling, max_memory_mb,
+                      resample_tier)
+
+
+def write_job_file(path, defaults, images):
+    """Write a job file for iter_job_file().
+
+    ``defaults`` maps setting names to the global values; ``images`` yields
+    (image path, overrides) pairs. Returns the number of images written.
+    """
+    count = 0
+    with open(path, "w", encoding="utf-8") as handle:
+        handle.write(json.dumps({"defaults": check_settings(defaults, "defaults")}, ensure_ascii=False) + "\n")
+        for image_path, overrides in images:
+            record = {"path": os.fspath(image_path)}
+            record.update(overrides)
+            handle.write(json.dumps(record, ensure_ascii=False) + "\n")
+            count += 1
+    return count
@@ -0,0 +1,154 @@
+"""Output sinks that collect tiles into archives instead of loose files.
+
+By default every tile is written as its own file in the folders that
+create_output_folder() makes. Passing a sink to run_batch() instead hands
+it every encoded tile from a single writer. A sink has
+``add(job, count, img_format, data)``, which stores one tile and returns
+the file it went into, and ``close()``.
+
+ArchiveSink writes WebDataset-style tar or zip shards of a capped size,
+plus a JSON Lines index that maps every source and tile to its shard and
+to the byte offset of its data within that shard.
+"""
+import io
+import os
+import json
+import time
+import tarfile
+import zipfile
+from pathlib import Path
+
+
+ARCHIVE_FORMATS = ("tar", "zip")
+DEFAULT_SHARD_MB = 1024
+
+# Shards and the index are written through buffers this large, so the file
+# system sees a few large sequential writes rather than one per tile.
+SINK_BUFFER_SIZE = 4 * 1024 * 1024
+
+# Room left for a member's headers when checking whether a tile still fits
+# in the current shard.
+MEMBER_OVERHEAD = 1024
+
+
+class _SequentialWriter:
+    """Write-only view of a file, so zipfile appends instead of seeking back."""
+    def __init__(self, handle):
+        self._handle = handle
+
+    def write(self, data):
+        return self._handle.write(data)
+
+    def flush(self):
+        self._handle.flush()
+
+
+class ArchiveSink:
+    """Streams tiles into size-capped tar or zip shards in ``directory``.
+
+    Shards are named ``{prefix}-000000.tar`` and so on; a new one is started
+    before a tile would take the current one past ``shard_size_mb`` (a tile
+    larger than that gets a shard to itself). Tiles are stored uncompressed,
+    named like the files the directory layout writes, with a numeric suffix
+    on the stem when two sources share one. ``{prefix}.index.jsonl`` gets a
+    line per tile with its absolute source path, tile number, shard, member
+    name, and the offset and size of its data in the shard, so a reader can
+    seek straight to it.
+    """
+    def __init__(self, directory, archive_format="tar", shard_size_mb=DEFAULT_SHARD_MB, prefix="tiles"):
+        if archive_format not in ARCHIVE_FORMATS:
+            raise ValueError(f"Unknown archive format {archive_format!r}")
+        self.directory = Path(directory)
+        self.archive_format = archive_format
+        self.shard_size = shard_size_mb * 1024 * 1024
+        self.prefix = prefix
+        self.shards = []
+        self.tiles = 0
+        self.bytes = 0
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.index_path = self.directory / f"{prefix}.index.jsonl"
+        self._index = open(self.index_path, "w", encoding="utf-8", buffering=SINK_BUFFER_SIZE)
+        self._handle = None
+        self._archive = None
+        self._mtime = int(time.time())
+        self._stems = set()
+        self._source = None
+        self._stem = None
+        self._resolved = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _stem_for(self, image_path):
+        # Tiles of one source arrive together, so only the current one is kept.
+        if image_path != self._source:
+            base = Path(image_path).stem
+            stem, number = base, 1
+            while stem in self._stems:
+                number += 1
+                stem = f"{base}_{number}"
+            self._stems.add(stem)
+            self._source, self._stem = image_path, stem
+            # Absolute, so the index still works when read from another directory.
+            self._resolved = os.fspath(Path(image_path).resolve())
+        return self._stem
+
+    def _open_shard(self):
+        path = self.directory / f"{self.prefix}-{len(self.shards):06d}.{self.archive_format}"
+        self._handle = open(path, "wb", buffering=SINK_BUFFER_SIZE)
+        if self.archive_format == "tar":
+            self._archive = tarfile.open(fileobj=self._handle, mode="w")
+        else:
+            self._archive = zipfile.ZipFile(_SequentialWriter(self._handle), "w", zipfile.ZIP_STORED)
+        self.shards.append(path)
+
+    def _close_shard(self):
+        if self._archive is not None:
+            self._archive.close()
+            self._handle.close()
+            self._archive = self._handle = None
+
+    def _shard_bytes(self):
+        if self._archive is None:
+            return 0
+        if self.archive_format == "tar":
+            return self._archive.offset
+        return self._archive.fp.tell()
+
+    def add(self, job, count, img_format, data):
+        """Store one encoded tile and return the path of the shard it went into."""
+        name = f"{self._stem_for(job.image_path)}_part_{count}.{img_format.lower()}"
+        if self._archive is not None and self._shard_bytes() + len(data) + MEMBER_OVERHEAD > self.shard_size:
+            self._close_shard()
+        if self._archive is None:
+            self._open_shard()
+        if self.archive_format == "tar":
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            info.mtime = self._mtime
+            self._archive.addfile(info, io.BytesIO(data))
+            # The data ends the member, padded out to a whole block.
+            blocks = -(-len(data) // tarfile.BLOCKSIZE)
+            offset = self._archive.offset - blocks * tarfile.BLOCKSIZE
+        else:
+            info = zipfile.ZipInfo(name, time.localtime(self._mtime)[:6])
+            self._archive.writestr(info, data)
+            offset = info.header_offset + len(info.FileHeader())
+        shard = self.shards[-1]
+        record = {"source": self._resolved, "tile": count, "shard": shard.name,
+                  "name": name, "offset": offset, "size": len(data)}
+        self._index.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self.tiles += 1
+        self.bytes += len(data)
+        return shard
+
+    def close(self):
+        """Finish the current shard and the index; an empty index is removed."""
+        self._close_shard()
+        if not self._index.closed:
+            self._index.close()
+            if not self.tiles:
+                self.index_path.unlink(missing_ok=True)
@@ -0,0 +1,340 @@
+"""Watch-folder daemon: split images as soon as they land in hot folders.
+
+FolderWatcher reports image files that have settled, meaning no writes
+for ``debounce`` seconds. On Linux it listens to inotify through libc.
+Elsewhere, or when inotify is unavailable, it polls the folders.
+watch() sends settled files to a WarmPool whose workers were started up
+front, so splitting one image costs no interpreter or Pillow start-up.
+"""
+import os
+import sys
+import json
+import time
+import ctypes
+import select
+import signal
+import struct
+import ctypes.util
+from pathlib import Path
+
+from splitter_engine import (
+    DEFAULT_RESAMPLE,
+    RESAMPLE_TIERS,
+    TILE_NAME_PATTERN,
+    TILING_MODES,
+    OutputManifest,
+    SplitJob,
+    WarmPool,
+    is_image_path,
+)
+from splitter_settings import JOB_DEFAULTS, check_settings
+
+
+# A file counts as written once its size and mtime have not changed for
+# this many seconds.
+DEFAULT_DEBOUNCE = 0.2
+
+# Polling interval when inotify is unavailable.
+DEFAULT_POLL_INTERVAL = 0.5
+
+# Images handed to the pool at once, per worker. The rest wait their turn
+# here, so a burst of arrivals doesn't pile up in the pool's queue.
+IN_FLIGHT_PER_WORKER = 2
+
+# Keys a watch config file may contain; "settings" uses the job file names.
+CONFIG_KEYS = ("folders", "settings", "workers", "debounce", "poll_interval", "tiling", "resample",
+               "max_memory_mb")
+
+# inotify(7) event bits.
+IN_MODIFY = 0x002
+IN_CLOSE_WRITE = 0x008
+IN_MOVED_TO = 0x080
+IN_CREATE = 0x100
+IN_Q_OVERFLOW = 0x4000
+WATCH_MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+_EVENT = struct.Struct("iIII")
+
+
+class _Inotify:
+    """Minimal inotify binding: watch folders, read (path, mask) events."""
+    def __init__(self):
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        self._libc = libc
+        self._fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self._folders = {}
+
+    def add(self, folder):
+        wd = self._libc.inotify_add_watch(self._fd, os.fsencode(folder), WATCH_MASK)
+        if wd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno), str(folder))
+        self._folders[wd] = folder
+
+    def read(self, timeout):
+        """Return the events that arrive within timeout seconds."""
+        ready, _, _ = select.select([self._fd], [], [], timeout)
+        if not ready:
+            return []
+        try:
+            data = os.read(self._fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+        events = []
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, length = _EVENT.unpack_from(data, offset)
+            offset += _EVENT.size
+            name = data[offset:offset + length].rstrip(b"\0")
+            offset += length
+            if mask & IN_Q_OVERFLOW:
+                events.append((None, mask))
+            elif name and wd in self._folders:
+                events.append((self._folders[wd] / os.fsdecode(name), mask))
+        return events
+
+    def close(self):
+        os.close(self._fd)
+
+
+def _signature(path):
+    stat = path.stat()
+    return stat.st_size, stat.st_mtime_ns
+
+
+def _is_image(path):
+    return is_image_path(path) and not TILE_NAME_PATTERN.search(path.stem)
+
+
+class FolderWatcher:
+    """Reports images in ``folders`` (not their subfolders) once they settle.
+
+    Uses inotify where available unless ``poll_interval`` is given, and
+    polls every ``poll_interval`` (or DEFAULT_POLL_INTERVAL) seconds
+    otherwise. Tiles written by the splitter itself are ignored.
+    """
+    def __init__(self, folders, debounce=DEFAULT_DEBOUNCE, poll_interval=None):
+        self.folders = [Path(folder) for folder in folders]
+        self.debounce = debounce
+        self.poll_interval = poll_interval or DEFAULT_POLL_INTERVAL
+        self._pending = {}  # path -> [deadline, signature, first seen]
+        self._inotify = None
+        if poll_interval is None and sys.platform.startswith("linux"):
+            try:
+                self._inotify = _Inotify()
+            except (OSError, AttributeError) as exc:
+                print(f"Warning: inotify unavailable ({exc}); polling instead")
+        if self._inotify is not None:
+            for folder in self.folders:
+                self._inotify.add(folder)
+        # Taken after the watches are set up, so nothing lands unseen in between.
+        self._snapshot = self._scan()
+        self._next_poll = time.monotonic() + self.poll_interval
+        self.mode = "inotify" if self._inotify is not None else "polling"
+
+    def existing(self):
+        """Return the images that were already in the folders at start-up."""
+        return sorted(self._snapshot)
+
+    def _scan(self):
+        """Return {path: (size, mtime)} for the images in the folders."""
+        snapshot = {}
+        for folder in self.folders:
+            try:
+                entries = list(os.scandir(folder))
+            except OSError as exc:
+                print(f"Warning: Cannot read {folder}: {exc}")
+                continue
+            for entry in entries:
+                path = Path(entry.path)
+                if not entry.is_file() or not _is_image(path):
+                    continue
+                try:
+                    snapshot[path] = _signature(path)
+                except OSError:
+                    continue
+        return snapshot
+
+    def _changed(self, path, now):
+        if not _is_image(path):
+            return
+        try:
+            signature = _signature(path)
+        except OSError:
+            # Deleted or renamed away before it settled.
+            self._pending.pop(path, None)
+            return
+        entry = self._pending.get(path)
+        if entry is None:
+            self._pending[path] = [now + self.debounce, signature, now]
+        else:
+            entry[0] = now + self.debounce
+            entry[1] = signature
+
+    def _poll(self, now):
+        snapshot = self._scan()
+        for path, signature in snapshot.items():
+            if self._snapshot.get(path) != signature:
+                self._changed(path, now)
+        self._snapshot = snapshot
+
+    def defer(self, path):
+        """Report path again once it settles, e.g. because it changed mid-split."""
+        self._changed(path, time.monotonic())
+
+    def wait(self, timeout):
+        """Wait up to timeout seconds; return ``(path, first seen)`` for settled images."""
+        now = time.monotonic()
+        deadlines = [entry[0] for entry in self._pending.values()]
+        if deadlines:
+            timeout = max(0.0, min(timeout, min(deadlines) - now))
+        if self._inotify is not None:
+            events = self._inotify.read(timeout)
+            now = time.monotonic()
+            for path, mask in events:
+                if path is None:
+                    # The kernel dropped events; rescan to catch up.
+                    self._poll(now)
+                else:
+                    self._changed(path, now)
+        else:
+            time.sleep(max(0.0, min(timeout, self._next_poll - now)))
+            now = time.monotonic()
+            if now >= self._next_poll:
+                self._poll(now)
+                self._next_poll = now + self.poll_interval
+        settled = []
+        for path, (deadline, signature, first_seen) in list(self._pending.items()):
+            if deadline > now:
+                continue
+            try:
+                current = _signature(path)
+            except OSError:
+                del self._pending[path]
+                continue
+            if current != signature:
+                self._pending[path] = [now + self.debounce, current, first_seen]
+                continue
+            del self._pending[path]
+            settled.append((path, first_seen))
+        return settled
+
+    def close(self):
+        if self._inotify is not None:
+            self._inotify.close()
+
+
+def load_config(path):
+    """Read a watch config file (JSON); unknown keys are warned about and ignored."""
+    with open(path, "r", encoding="utf-8") as handle:
+        config = json.load(handle)
+    if not isinstance(config, dict):
+        raise ValueError(f"{path}: expected a JSON object")
+    for key in list(config):
+        if key not in CONFIG_KEYS:
+            print(f"Warning: {path}: unknown key {key!r} ignored")
+            del config[key]
+    base_dir = Path(path).resolve().parent
+    config["folders"] = [base_dir / os.path.expanduser(folder) for folder in config.get("folders", [])]
+    config["settings"] = check_settings(config.get("settings") or {}, f"{path} settings")
+    if config.get("tiling", "auto") not in TILING_MODES:
+        raise ValueError(f"{path}: tiling must be one of {', '.join(TILING_MODES)}")
+    if config.get("resample", DEFAULT_RESAMPLE) not in RESAMPLE_TIERS:
+        raise ValueError(f"{path}: resample must be one of {', '.join(RESAMPLE_TIERS)}")
+    return config
+
+
+def make_job(path, config):
+    """Return the SplitJob for an image with the config's settings."""
+    settings = dict(JOB_DEFAULTS, **config.get("settings", {}))
+    return SplitJob(path, settings["images_across"], settings["images_high"],
+                    settings["custom_size"] or settings["base_size"], settings["custom_folder"],
+                    settings["maintain_format"], config.get("tiling", "auto"), config.get("max_memory_mb"),
+                    settings["encoder"], settings["quality"], config.get("resample", DEFAULT_RESAMPLE))
+
+
+def watch(config, timestamp, existing=True, on_event=print):
+    """Split images landing in ``config["folders"]`` until interrupted.
+
+    Images already there are split first if their outputs aren't current,
+    as tracked by the same manifests as --incremental. At most
+    IN_FLIGHT_PER_WORKER images per worker are in the pool at once; the
+    rest are submitted in arrival order as slots free up. ``on_event`` is
+    called with a line of text for every image done or failed.
+    """
+    watcher = FolderWatcher(config["folders"], config.get("debounce", DEFAULT_DEBOUNCE),
+                            config.get("poll_interval"))
+    manifest = OutputManifest()
+    pool = WarmPool(config.get("workers", 1))
+    in_flight = {}  # path -> (job, future, first seen)
+    waiting = {}  # path -> first seen, in arrival order, while the pool is full
+    limit = pool.workers * IN_FLIGHT_PER_WORKER
+
+    def submit(path, first_seen):
+        if path in in_flight:
+            watcher.defer(path)
+            return
+        if len(in_flight) >= limit:
+            waiting.setdefault(path, first_seen)
+            return
+        job = make_job(path, config)
+        try:
+            if manifest.is_current(job):
+                return
+        except OSError:
+            pass
+        try:
+            future = pool.submit(job, timestamp)
+        except Exception as exc:
+            # E.g. a worker died and broke the pool; report it and keep going.
+            on_event(f"  {path.name} ✗ {exc or type(exc).__name__}")
+            return
+        in_flight[path] = (job, future, first_seen)
+
+    def reap():
+        for path, (job, future, first_seen) in list(in_flight.items()):
+            if not future.done():
+                continue
+            del in_flight[path]
+            latency = time.monotonic() - first_seen
+            try:
+                outputs = future.result()
+            except Exception as exc:
+                on_event(f"  {path.name} ✗ {exc or type(exc).__name__}")
+                continue
+            try:
+                manifest.record(job, outputs)
+            except OSError:
+                pass  # Deleted already; nothing to skip next time.
+            on_event(f"  {path.name}: {len(outputs)} tile(s), {latency:.2f}s after it landed")
+        manifest.save()
+
+    def submit_waiting():
+        while waiting and len(in_flight) < limit:
+            path = next(iter(waiting))
+            submit(path, waiting.pop(path))
+
+    def stop(signum, frame):
+        raise KeyboardInterrupt
+
+    previous_handler = signal.signal(signal.SIGTERM, stop)
+    try:
+        on_event(f"Watching {', '.join(str(folder) for folder in watcher.folders)} "
+                 f"({watcher.mode}, {pool.workers} warm worker(s)). Press Ctrl+C to stop.")
+        if existing:
+            now = time.monotonic()
+            for path in watcher.existing():
+                submit(path, now)
+        while True:
+            for path, first_seen in watcher.wait(0.05 if in_flight else 1.0):
+                submit(path, first_seen)
+            reap()
+            submit_waiting()
+    except KeyboardInterrupt:
+        on_event("Stopping; waiting for images in progress...")
+    finally:
+        signal.signal(signal.SIGTERM, previous_handler)
+        watcher.close()
+        pool.close()
+        reap()
@@ -0,0 +1,27 @@
+"""Shared fixtures; the splitter modules live at the repository root."""
+import sys
+from pathlib import Path
+
+import pytest
+from PIL import Image
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+
+def make_image(path, size=(640, 480), mode="RGB", img_format=None):
+    """Write a noisy gradient, so resampling differences show in the pixels."""
+    img = Image.linear_gradient("L").resize(size)
+    if mode == "RGB":
+        img = Image.merge("RGB", (img, Image.effect_noise(size, 64),
+                                  img.transpose(Image.Transpose.FLIP_TOP_BOTTOM)))
+    elif mode != "L":
+        img = img.convert(mode)
+    img.save(path, img_format)
+    return path
+
+
+@pytest.fixture
+def image_factory(tmp_path):
+    def factory(name="source.png", **kwargs):
+        return make_image(tmp_path / name, **kwargs)
+    return factory
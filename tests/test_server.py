@@ -0,0 +1,50 @@
+import io
+import json
+import threading
+import urllib.error
+import urllib.request
+import zipfile
+
+import pytest
+from PIL import Image
+
+from splitter_server import SplitServer
+
+
+@pytest.fixture
+def server():
+    server = SplitServer(("127.0.0.1", 0), workers=1)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    thread.join()
+    server.close()
+
+
+def post(server, query, data):
+    request = urllib.request.Request(f"{server.url}split?{query}", data=data, method="POST")
+    with urllib.request.urlopen(request, timeout=30) as response:
+        return response.status, response.headers, response.read()
+
+
+def test_split_returns_zip_of_tiles(server, image_factory):
+    data = image_factory(size=(600, 400)).read_bytes()
+    status, headers, body = post(server, "across=3&high=2&size=100&name=cat.png", data)
+    assert status == 200
+    assert headers["Content-Type"] == "application/zip"
+    with zipfile.ZipFile(io.BytesIO(body)) as archive:
+        names = archive.namelist()
+        assert names == [f"cat_part_{count}.jpeg" for count in range(1, 7)]
+        with Image.open(io.BytesIO(archive.read(names[0]))) as tile:
+            assert (tile.format, tile.size) == ("JPEG", (100, 100))
+
+
+def test_split_rejects_bad_grid(server, image_factory):
+    data = image_factory(size=(600, 400)).read_bytes()
+    with pytest.raises(urllib.error.HTTPError) as caught:
+        post(server, "across=0&high=2", data)
+    assert caught.value.code == 400
+    assert "across" in json.loads(caught.value.read())["error"]
+    health = server.health()
+    assert (health["bad_request"], health["split"]) == (1, 0)
@@ -0,0 +1,45 @@
+import pytest
+
+from splitter_settings import JobFileError, SettingsTable, iter_job_file
+
+
+def test_pretty_printed_job_file_accepts_an_array(tmp_path):
+    job_file = tmp_path / "jobs.json"
+    job_file.write_text('[\n {"defaults": {"images_across": 2}},\n {"path": "a.jpg"},\n'
+                        ' {"path": "b.jpg", "images_high": 3}\n]\n')
+    jobs = list(iter_job_file(job_file))
+    assert [(job.image_path.name, job.images_across, job.images_high) for job in jobs] == [
+        ("a.jpg", 2, 1), ("b.jpg", 2, 3)]
+    assert jobs[0].image_path == tmp_path / "a.jpg"
+
+
+def test_malformed_pretty_printed_job_file_names_the_line(tmp_path):
+    job_file = tmp_path / "jobs.json"
+    job_file.write_text('{\n "defaults": {},\n "images": [{"path": "a.jpg"},]\n}\n')
+    with pytest.raises(JobFileError, match=r"jobs\.json line 3: not valid JSON"):
+        list(iter_job_file(job_file))
+
+
+def test_malformed_job_lines_are_skipped(tmp_path, capsys):
+    job_file = tmp_path / "jobs.jsonl"
+    job_file.write_text('{"path": "a.jpg"}\n{"path": \n{"path": "b.jpg"}\n')
+    assert [job.image_path.name for job in iter_job_file(job_file)] == ["a.jpg", "b.jpg"]
+    assert "jobs.jsonl line 2: not valid JSON" in capsys.readouterr().out
+
+
+@pytest.mark.parametrize("value, expected", [
+    (-3, None), (0, None), ("", None), ("  ", None), ("abc", None), (" 640 ", 640), (2 ** 40, 2 ** 32 - 1)])
+def test_settings_table_coerces_spinbox_values(value, expected):
+    table = SettingsTable()
+    row = table.add_row()
+    table.set(row, "base_size", value)
+    assert table.get(row, "base_size") == expected
+
+
+def test_settings_table_clamps_quality():
+    table = SettingsTable()
+    row = table.add_row()
+    table.set(row, "quality", 250)
+    assert table.get(row, "quality") == 100
+    table.set(row, "quality", -1)
+    assert not table.has_overrides(row)
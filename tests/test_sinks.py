@@ -0,0 +1,20 @@
+import json
+
+from splitter_engine import SplitJob, run_batch
+from splitter_sinks import ArchiveSink
+
+
+def test_archive_index_records_absolute_sources(image_factory, tmp_path, monkeypatch):
+    image_factory(size=(600, 400))
+    monkeypatch.chdir(tmp_path)
+    job = SplitJob("source.png", 3, 2, 100, None, False)
+    with ArchiveSink("shards", prefix="tiles") as sink:
+        result = run_batch([job], "ts", sink=sink)
+    assert not result.errors
+
+    records = [json.loads(line) for line in (tmp_path / "shards" / "tiles.index.jsonl").open()]
+    assert [record["tile"] for record in records] == list(range(1, 7))
+    assert {record["source"] for record in records} == {str(tmp_path / "source.png")}
+    shard = (tmp_path / "shards" / records[0]["shard"]).read_bytes()
+    data = shard[records[0]["offset"]:records[0]["offset"] + records[0]["size"]]
+    assert data.startswith(b"\xff\xd8")
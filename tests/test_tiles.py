@@ -0,0 +1,60 @@
+import io
+
+from PIL import Image
+
+from splitter_engine import SplitJob, _PixelBuffer, iter_tiles, run_batch
+
+
+def test_iter_tiles_positions_and_sources(image_factory):
+    source = image_factory(size=(600, 400))
+    from_path = list(iter_tiles(source, 3, 2, 100))
+    assert [(tile.count, tile.row, tile.column) for tile in from_path] == [
+        (1, 0, 0), (2, 0, 1), (3, 0, 2), (4, 1, 0), (5, 1, 1), (6, 1, 2)]
+    assert all(tile.image.size == (100, 100) and tile.data is None for tile in from_path)
+
+    data = source.read_bytes()
+    from_bytes = [tile.data for tile in iter_tiles(data, 3, 2, 100, encode=True)]
+    with source.open("rb") as handle:
+        from_file = [tile.data for tile in iter_tiles(handle, 3, 2, 100, encode=True)]
+        assert not handle.closed
+    assert from_bytes == from_file
+    assert Image.open(io.BytesIO(from_bytes[0])).format == "JPEG"
+
+
+def test_pool_output_matches_iter_tiles_for_large_source(image_factory, tmp_path):
+    # Over 64 MP, the size the pool used to fan out by grid row.
+    source = image_factory("huge.bmp", size=(8200, 8000))
+    job = SplitJob(source, 3, 4, 700, "tiles", False)
+    result = run_batch([job], "ts", workers=2)
+    assert not result.errors
+
+    written = sorted((tmp_path / "tiles" / "huge").iterdir(), key=lambda path: int(path.stem.rsplit("_", 1)[1]))
+    expected = [tile.data for tile in iter_tiles(source, 3, 4, 700, encode=True)]
+    assert [path.read_bytes() for path in written] == expected
+
+
+def test_low_memory_per_tile_matches_normal_run_for_palette_source(image_factory):
+    source = image_factory(size=(3001, 2399), mode="P")
+    normal = [tile.image.tobytes() for tile in iter_tiles(source, 2, 7, 200, tiling="per_tile")]
+    banded = [tile.image.tobytes() for tile in iter_tiles(source, 2, 7, 200, tiling="per_tile",
+                                                          max_memory_mb=2)]
+    assert banded == normal
+
+
+def test_pixel_buffer_views_match_crop(image_factory):
+    with Image.open(image_factory(size=(601, 403))) as img:
+        pixels = _PixelBuffer.decode(img)
+        assert pixels is not None
+        for box in [(0, 0, 601, 403), (0, 0, 200, 134), (200, 134, 400, 268), (401, 269, 601, 403)]:
+            view = pixels.view(box)
+            assert view.size == (box[2] - box[0], box[3] - box[1])
+            assert view.tobytes() == img.crop(box).tobytes()
+
+
+def test_tiles_fall_back_to_crop_without_pillow_internals(image_factory, monkeypatch):
+    source = image_factory(size=(601, 403))
+    expected = [tile.image.tobytes() for tile in iter_tiles(source, 3, 3, 100, tiling="per_tile")]
+    monkeypatch.delattr(Image.core, "map_buffer")
+    assert [tile.image.tobytes() for tile in iter_tiles(source, 3, 3, 100, tiling="per_tile")] == expected
+    banded = iter_tiles(source, 3, 3, 100, tiling="per_tile", max_memory_mb=0.5)
+    assert [tile.image.tobytes() for tile in banded] == expected
@@ -0,0 +1,40 @@
+import sys
+import json
+import time
+import signal
+import subprocess
+from pathlib import Path
+
+from conftest import make_image
+
+CLI = Path(__file__).resolve().parent.parent / "splitter_with_per_image.py"
+
+
+def wait_for(predicate, timeout=20):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.1)
+    return False
+
+
+def test_corrupt_image_does_not_stop_the_daemon(tmp_path):
+    hot = tmp_path / "hot"
+    hot.mkdir()
+    config = tmp_path / "watch.json"
+    config.write_text(json.dumps({"folders": ["hot"], "poll_interval": 0.1, "debounce": 0.1,
+                                  "settings": {"images_across": 2, "images_high": 2, "base_size": 64}}))
+    (hot / "broken.jpg").write_bytes(b"not a jpeg at all")
+    daemon = subprocess.Popen([sys.executable, str(CLI), "watch", "--config", str(config),
+                               "--poll", "0.1"], stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+    try:
+        time.sleep(1)
+        make_image(hot / "good.png")
+        assert wait_for(lambda: len(list(hot.glob("good/good_part_*.jpeg"))) == 4)
+        assert daemon.poll() is None
+    finally:
+        daemon.send_signal(signal.SIGTERM)
+        output = daemon.communicate(timeout=20)[0]
+    assert "broken.jpg ✗" in output
+    assert daemon.returncode == 0